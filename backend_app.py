@@ -1,5 +1,5 @@
 from fastapi import FastAPI, Request, BackgroundTasks, HTTPException, Body, Form
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
@@ -8,6 +8,8 @@ import sys
 import asyncio
 import logging
 import time
+import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional, List
 from pprint import pprint
 
@@ -26,13 +28,15 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # 例如services/pr_collector/pr_collector.py中使用了../../cfg/config.json
 
 # 导入服务模块
-from services.pr_collector.pr_collector import collect_merged_prs_task
-from services.rag_service.rag_service import review_pr
+from services.pr_collector.pr_collector import acollect_merged_prs_task
+from services.rag_service.rag_service import review_pr, review_pr_stream
 from services.repo_manager.repo_manager import repo_service_manager
-from util.config_manager import ConfigManager
+from libs.rag_base.graphs.graph_defs import install_llm_cache
+from util.config_manager import get_default_config_manager
+from util import dashscope_client
 
 # 初始化配置管理器
-config_manager = ConfigManager()
+config_manager = get_default_config_manager()
 
 # 检查未处理PR文件是否有内容
 def has_unhandled_prs(owner: str, repo: str) -> bool:
@@ -105,9 +109,37 @@ vectorstore_build_semaphore = asyncio.Semaphore(max_concurrent_vectorstore_build
 logger.info(f"vectorstore构建任务最大并发数设置为: {max_concurrent_vectorstore_build}")
 
 
+# PR收集和vectorstore构建等阻塞任务专用的线程池，在应用启动时创建
+# （启动前的预处理阶段尚未创建时，退回到事件循环默认线程池）
+INGEST_EXECUTOR_WORKERS = 4
+ingest_executor: Optional[ThreadPoolExecutor] = None
+
 # 初始化 FastAPI 应用
 app = FastAPI(title="PR审查系统", description="基于 LangGraph 的PR审查和问答系统")
 
+@app.on_event("startup")
+async def create_ingest_executor():
+    """创建阻塞任务专用线程池，避免占用默认线程池影响请求处理"""
+    global ingest_executor
+    ingest_executor = ThreadPoolExecutor(max_workers=INGEST_EXECUTOR_WORKERS, thread_name_prefix="ingest")
+    logger.info(f"已创建阻塞任务线程池，线程数: {INGEST_EXECUTOR_WORKERS}")
+    # 预热到DashScope的共享连接池
+    await dashscope_client.prewarm()
+
+@app.on_event("startup")
+async def setup_llm_cache():
+    """按配置启用LLM缓存（默认关闭）"""
+    install_llm_cache()
+
+@app.on_event("shutdown")
+async def shutdown_ingest_executor():
+    """关闭阻塞任务线程池"""
+    global ingest_executor
+    if ingest_executor is not None:
+        ingest_executor.shutdown(wait=False, cancel_futures=True)
+        ingest_executor = None
+    await dashscope_client.aclose()
+
 # 允许跨域请求
 app.add_middleware(
     CORSMiddleware,
@@ -144,7 +176,7 @@ async def run_collect_prs_with_semaphore(owner: str, repo: str):
         try:
             logger.info(f"开始执行PR收集任务: {owner}/{repo}")
             # 调用实际的PR收集函数
-            await asyncio.to_thread(collect_merged_prs_task, owner, repo)
+            await acollect_merged_prs_task(owner, repo, ingest_executor)
             logger.info(f"PR收集任务完成: {owner}/{repo}")
         except Exception as e:
             logger.error(f"PR收集任务失败: {owner}/{repo}, 错误: {str(e)}")
@@ -175,7 +207,7 @@ async def run_vectorstore_build_with_semaphore(owner: str, repo: str):
         try:
             logger.info(f"开始执行vectorstore构建任务: {owner}/{repo}")
             # 调用实际的vectorstore构建函数
-            await asyncio.to_thread(repo_service_manager.update_service_vectorstore, owner, repo)
+            await repo_service_manager.aupdate_service_vectorstore(owner, repo, ingest_executor)
             logger.info(f"vectorstore构建任务完成: {owner}/{repo}")
         except Exception as e:
             logger.error(f"vectorstore构建任务失败: {owner}/{repo}, 错误: {str(e)}")
@@ -223,6 +255,27 @@ async def api_review_pr(owner: str = Body(...), repo: str = Body(...), pr_id: st
         logger.error(f"PR审查请求处理失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"内部错误: {str(e)}")
 
+# 服务2（流式）：PR review，以Server-Sent Events逐步返回生成内容
+@app.post("/api/review_pr/stream")
+async def api_review_pr_stream(owner: str = Body(...), repo: str = Body(...), pr_id: str = Body(None), question: str = Body(None)):
+    """PR review流式接口，token事件为增量预览，final事件为最终结果"""
+    logger.info(f"收到流式PR审查请求: owner={owner}, repo={repo}, pr_id={pr_id}, question={question}")
+    
+    # 参数和服务状态错误在开始流式输出前以HTTP错误返回
+    events = await review_pr_stream(owner, repo, pr_id, question)
+    
+    async def _sse():
+        try:
+            async for event in events:
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            logger.info(f"流式PR审查请求处理完成: owner={owner}, repo={repo}")
+        except Exception as e:
+            logger.error(f"流式PR审查请求处理失败: {str(e)}")
+            error_event = {"type": "final", "node": None, "text": f"内部错误: {str(e)}"}
+            yield f"data: {json.dumps(error_event, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(_sse(), media_type="text/event-stream")
+
 # 服务4：获取所有仓库的服务数据
 @app.get("/api/review/all")
 async def get_all_review_services():
@@ -236,7 +289,8 @@ async def get_all_review_services():
         
         # 构建返回数据
         result = []
-        for service_id, service_info in all_services.items():
+        # 其他线程可能同时注册新仓库，遍历前先取快照
+        for service_id, service_info in list(all_services.items()):
             owner, repo = service_id.split('/')
             task_key = service_id
             has_excel = os.path.exists(service_info["excel_file_path"])
@@ -383,12 +437,8 @@ def initialize_all_vectorstores():
             logger.info("没有已注册的仓库服务，跳过vectorstore初始化")
             return
         
-        # 创建一个事件循环
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        # 创建任务列表
-        tasks = []
+        # 收集需要构建的仓库
+        pairs = []
         for service_id, service_info in all_services.items():
             owner, repo = service_id.split('/')
             # 检查vectorstore是否已初始化
@@ -396,20 +446,20 @@ def initialize_all_vectorstores():
                 # 检查是否存在Excel文件
                 if os.path.exists(service_info["excel_file_path"]):
                     logger.info(f"发现未初始化的vectorstore，开始构建: {owner}/{repo}")
-                    task = loop.create_task(run_vectorstore_build_with_semaphore(owner, repo))
-                    tasks.append(task)
+                    pairs.append((owner, repo))
                 else:
                     logger.info(f"仓库 {owner}/{repo} 缺少Excel文件，跳过vectorstore构建")
             else:
                 logger.info(f"仓库 {owner}/{repo} 的vectorstore已初始化")
         
-        # 运行所有任务
-        if tasks:
-            logger.info(f"开始执行 {len(tasks)} 个vectorstore初始化任务，最大并发数: {max_concurrent_vectorstore_build}")
-            loop.run_until_complete(asyncio.gather(*tasks))
+        # 在线程池中并行构建所有仓库
+        if pairs:
+            logger.info(f"开始执行 {len(pairs)} 个vectorstore初始化任务，最大并发数: {max_concurrent_vectorstore_build}")
+            results = repo_service_manager.build_all(pairs, max_workers=max_concurrent_vectorstore_build)
+            failed = [key for key, ok in results.items() if not ok]
+            if failed:
+                logger.warning(f"以下仓库的vectorstore构建失败: {', '.join(failed)}")
         
-        # 关闭事件循环
-        loop.close()
         logger.info("所有仓库vectorstore初始化任务执行完成")
     except Exception as e:
         logger.error(f"初始化所有仓库vectorstore时出错: {str(e)}")
@@ -421,8 +471,8 @@ if __name__ == "__main__":
     
     # 扫描PR数据目录，检查是否有可用的repo数据
     try:
-        from util.config_manager import ConfigManager
-        config_manager = ConfigManager()
+        from util.config_manager import get_default_config_manager
+        config_manager = get_default_config_manager()
         pr_review_data_dir = config_manager.get_pr_review_data_dir()
         
         logger.info(f"配置的PR数据目录: {pr_review_data_dir}")
@@ -11,7 +11,7 @@ import argparse
 import requests
 from typing import List, Optional
 
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
 from .github_pr_to_excel import GitHubPRToExcelExporter
 
 
@@ -26,7 +26,7 @@ class GitHubAllPRsExporter:
             auto_update_pr_data: Whether to automatically update PR data by fetching latest PRs from GitHub
         """
         # 初始化配置管理器（使用自动计算的默认路径）
-        config_manager = ConfigManager()
+        config_manager = get_default_config_manager()
         # 如果没有传入token，则从配置文件中获取
         token = token or config_manager.get_github_token()
         # 如果没有传入auto_update_pr_data，则从配置文件中获取
@@ -54,7 +54,7 @@ class GitHubAllPRsExporter:
             Path to the PR file
         """
         # Get PR review data directory from config
-        config_manager = ConfigManager()
+        config_manager = get_default_config_manager()
         data_dir = config_manager.get_pr_review_data_dir()
         
         # Build the full directory path
@@ -79,7 +79,7 @@ class GitHubAllPRsExporter:
             Path to the latest PR file
         """
         # Get PR review data directory from config
-        config_manager = ConfigManager()
+        config_manager = get_default_config_manager()
         data_dir = config_manager.get_pr_review_data_dir()
         
         # Build the full directory path
@@ -293,7 +293,7 @@ def main():
     args = parser.parse_args()
     
     # 初始化配置管理器并获取GitHub token
-    config_manager = ConfigManager()
+    config_manager = get_default_config_manager()
     if not args.token:
         args.token = config_manager.get_github_token()
     
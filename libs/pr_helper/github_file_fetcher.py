@@ -3,7 +3,7 @@ import argparse
 import os
 import sys
 
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
 
 class GitHubFileFetcher:
     def __init__(self, auth_token=None):
@@ -13,7 +13,7 @@ class GitHubFileFetcher:
             auth_token (str, optional): GitHub个人访问令牌，用于访问私有仓库或提高API速率限制
         """
         # 初始化配置管理器（使用自动计算的默认路径）
-        config_manager = ConfigManager()
+        config_manager = get_default_config_manager()
         # 如果没有传入auth_token，则从配置文件中获取
         self.auth_token = auth_token or config_manager.get_github_token()
         self.base_url = "https://api.github.com"
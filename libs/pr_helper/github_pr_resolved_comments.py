@@ -14,7 +14,7 @@ import argparse
 import requests
 from typing import Dict, List, Optional
 
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
 
 
 class GitHubPRCommentsFetcher:
@@ -27,7 +27,7 @@ class GitHubPRCommentsFetcher:
             token: GitHub personal access token, used to access private repositories or increase API rate limits
         """
         # 初始化配置管理器（使用自动计算的默认路径）
-        config_manager = ConfigManager()
+        config_manager = get_default_config_manager()
         # 如果没有传入token，则从配置文件中获取
         token = token or config_manager.get_github_token()
         
@@ -31,6 +31,9 @@ class GitHubPRToExcelExporter:
         }
         if token:
             self.headers["Authorization"] = f"token {token}"
+        # Shared session so repeated API calls reuse keep-alive connections (and TLS sessions)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
     
     def get_pr_details(self, owner: str, repo: str, pr_number: int) -> Dict:
         """Get PR details including description and linked issues
@@ -44,7 +47,7 @@ class GitHubPRToExcelExporter:
             Dictionary containing PR details
         """
         url = f"{self.base_url}/repos/{owner}/{repo}/pulls/{pr_number}"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url)
         response.raise_for_status()
         return response.json()
     
@@ -60,7 +63,7 @@ class GitHubPRToExcelExporter:
             List of issue comments in the PR
         """
         url = f"{self.base_url}/repos/{owner}/{repo}/issues/{pr_number}/comments"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url)
         response.raise_for_status()
         return response.json()
     
@@ -76,7 +79,7 @@ class GitHubPRToExcelExporter:
             List of review comments in the PR
         """
         url = f"{self.base_url}/repos/{owner}/{repo}/pulls/{pr_number}/comments"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url)
         response.raise_for_status()
         return response.json()
     
@@ -94,7 +97,7 @@ class GitHubPRToExcelExporter:
             List of general comments in the PR
         """
         url = f"{self.base_url}/repos/{owner}/{repo}/pulls/{pr_number}/reviews"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url)
         response.raise_for_status()
         
         # Extract body text from reviews where body is not empty
@@ -171,7 +174,7 @@ class GitHubPRToExcelExporter:
         diff_headers = self.headers.copy()
         diff_headers["Accept"] = "application/vnd.github.v3.diff"
         
-        response = requests.get(url, headers=diff_headers)
+        response = self.session.get(url, headers=diff_headers)
         response.raise_for_status()
         
         # Return the diff content
@@ -9,7 +9,7 @@ import argparse
 import pandas as pd
 from typing import Optional
 
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
 from github_pr_to_excel import GitHubPRToExcelExporter
 
 
@@ -23,7 +23,7 @@ class PRAuditTool:
             token: GitHub personal access token, used to access private repositories or increase API rate limits
         """
         # 初始化配置管理器（使用自动计算的默认路径）
-        config_manager = ConfigManager()
+        config_manager = get_default_config_manager()
         # 如果没有传入token，则从配置文件中获取
         token = token or config_manager.get_github_token()
         
@@ -117,7 +117,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
     
     # 初始化配置管理器并获取GitHub token
-    config_manager = ConfigManager()
+    config_manager = get_default_config_manager()
     if not args.token:
         args.token = config_manager.get_github_token()
     
@@ -8,11 +8,16 @@ helping users apply the PR's diff to these files.
 
 import os
 import sys
+import base64
 import argparse
 import requests
+from requests.adapters import HTTPAdapter
 from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Set
 
+# Default number of concurrent download threads; the connection pool is sized to match
+DEFAULT_MAX_WORKERS = 8
+
 
 class PRFilesPreDownloader:
     """Tool class for downloading pre-submission versions of all files in a PR"""
@@ -29,6 +34,11 @@ class PRFilesPreDownloader:
         }
         if token:
             self.headers["Authorization"] = f"token {token}"
+        # Shared session so all requests reuse keep-alive connections (and TLS sessions)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(DEFAULT_MAX_WORKERS, 10))
+        self.session.mount("https://", adapter)
         
     def get_pr_info(self, owner: str, repo: str, pr_number: int) -> Dict:
         """Get basic information about the PR
@@ -42,7 +52,7 @@ class PRFilesPreDownloader:
             Dictionary containing PR information
         """
         url = f"{self.base_url}/repos/{owner}/{repo}/pulls/{pr_number}"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url)
         response.raise_for_status()
         return response.json()
     
@@ -57,10 +67,16 @@ class PRFilesPreDownloader:
         Returns:
             List of files modified in the PR
         """
-        url = f"{self.base_url}/repos/{owner}/{repo}/pulls/{pr_number}/files"
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
-        return response.json()
+        # GitHub defaults to 30 files per page; request the maximum page size
+        # and follow the Link header so large PRs are listed completely
+        url = f"{self.base_url}/repos/{owner}/{repo}/pulls/{pr_number}/files?per_page=100"
+        files = []
+        while url:
+            response = self.session.get(url)
+            response.raise_for_status()
+            files.extend(response.json())
+            url = response.links.get("next", {}).get("url")
+        return files
     
     def get_file_content_before_pr(self, owner: str, repo: str, file_path: str, base_sha: str) -> str:
         """Get file content before PR submission
@@ -75,7 +91,7 @@ class PRFilesPreDownloader:
             File content string
         """
         url = f"{self.base_url}/repos/{owner}/{repo}/contents/{file_path}?ref={base_sha}"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url)
         
         # Handle possible error cases
         if response.status_code == 404:
@@ -87,13 +103,12 @@ class PRFilesPreDownloader:
         # Check if content is base64 encoded
         content_data = response.json()
         if isinstance(content_data, dict) and "content" in content_data:
-            import base64
             return base64.b64decode(content_data["content"]).decode("utf-8", errors="replace")
         
         return str(content_data)
     
     def download_pr_files_before(self, owner: str, repo: str, pr_number: int, 
-                               output_dir: str, max_workers: int = 5) -> List[str]:
+                               output_dir: str, max_workers: int = DEFAULT_MAX_WORKERS) -> List[str]:
         """Download pre-submission versions of all files in the PR
         
         Args:
@@ -156,7 +171,7 @@ def main():
     parser.add_argument("--pr", type=int, required=True, help="PR number")
     parser.add_argument("--output", default="./pr_files_before", help="Output directory")
     parser.add_argument("--token", help="GitHub personal access token")
-    parser.add_argument("--threads", type=int, default=5, help="Number of concurrent download threads")
+    parser.add_argument("--threads", type=int, default=DEFAULT_MAX_WORKERS, help="Number of concurrent download threads")
     
     args = parser.parse_args()
     if not args.token:
@@ -0,0 +1,136 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+
+def evidence_ids(documents) -> frozenset:
+    """计算检索结果的证据ID集合，优先使用Document.id，否则使用内容哈希"""
+    ids = []
+    for doc in documents:
+        doc_id = getattr(doc, "id", None)
+        if not doc_id:
+            doc_id = hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+        ids.append(doc_id)
+    return frozenset(ids)
+
+
+def _quantize(vectors: np.ndarray):
+    """按向量做int8对称量化，返回(int8矩阵, 每行缩放系数)"""
+    vectors = np.atleast_2d(vectors)
+    scale = np.abs(vectors).max(axis=1, keepdims=True) / 127.0
+    scale[scale == 0] = 1.0
+    quantized = np.round(vectors / scale).astype(np.int8)
+    return quantized, scale.astype(np.float32).ravel()
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class SemanticCache:
+    """单个owner/repo的两级答案缓存
+
+    1. 精确匹配：sha256(缓存键 + owner + repo) -> answer，LRU淘汰；
+       缓存键由调用方决定，涉及具体PR的查询使用PR编号和head SHA（见rag_service._answer_cache_key）
+    2. 语义匹配：查询向量余弦相似度 >= similarity_threshold，且当前检索证据与
+       缓存证据的Jaccard >= evidence_threshold 时才复用答案，避免语料变化后返回过期答案；
+       只有写入时带查询向量的条目参与语义匹配，PR查询写入时不带向量
+
+    语义检索用的向量矩阵以int8（每行一个缩放系数）保存，内存占用是FP32的1/4。
+    """
+
+    def __init__(self, owner: str, repo: str, max_entries: int = 256,
+                 similarity_threshold: float = 0.92, evidence_threshold: float = 0.7):
+        self.owner = owner
+        self.repo = repo
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.evidence_threshold = evidence_threshold
+        # key -> ((int8 embedding, scale) or None, evidence ids, answer)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # 语义检索用的int8向量矩阵及每行缩放系数，条目变化后懒重建
+        self._matrix: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._lock = threading.Lock()
+
+    def _key(self, query: str) -> str:
+        return hashlib.sha256(f"{query}\x00{self.owner}\x00{self.repo}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _normalize(embedding: Iterable[float]) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def get_exact(self, query: str) -> Optional[str]:
+        """精确匹配命中时返回缓存答案"""
+        key = self._key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def get_semantic(self, query_embedding, current_evidence: frozenset) -> Optional[str]:
+        """语义匹配：余弦相似度和证据Jaccard同时达标时返回缓存答案"""
+        query_q, query_scale = _quantize(self._normalize(query_embedding))
+        with self._lock:
+            if self._matrix is None:
+                self._rebuild_matrix()
+            if not self._matrix_keys:
+                return None
+            # int32累加避免溢出，再乘回两侧的缩放系数得到近似余弦相似度
+            dots = self._matrix.astype(np.int32) @ query_q[0].astype(np.int32)
+            scores = dots * self._scales * query_scale[0]
+            # 按相似度从高到低检查，直到低于阈值
+            for idx in np.argsort(scores)[::-1]:
+                if scores[idx] < self.similarity_threshold:
+                    break
+                key = self._matrix_keys[idx]
+                _, cached_evidence, answer = self._entries[key]
+                if _jaccard(cached_evidence, current_evidence) >= self.evidence_threshold:
+                    self._entries.move_to_end(key)
+                    return answer
+        return None
+
+    def put(self, query: str, query_embedding, evidence: frozenset, answer: str):
+        """写入缓存，超过容量时淘汰最久未使用的条目"""
+        key = self._key(query)
+        vec = None
+        if query_embedding is not None:
+            quantized, scale = _quantize(self._normalize(query_embedding))
+            vec = (quantized[0], scale[0])
+        with self._lock:
+            self._entries[key] = (vec, evidence, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        """清空缓存（vectorstore重建后调用）"""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self._scales = None
+            self._matrix_keys = []
+
+    def _rebuild_matrix(self):
+        keys = [k for k, entry in self._entries.items() if entry[0] is not None]
+        self._matrix_keys = keys
+        if keys:
+            self._matrix = np.stack([self._entries[k][0][0] for k in keys])
+            self._scales = np.array([self._entries[k][0][1] for k in keys], dtype=np.float32)
+        else:
+            self._matrix = np.empty((0, 0), dtype=np.int8)
+            self._scales = np.empty(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self._entries)
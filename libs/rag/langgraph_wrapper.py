@@ -1,51 +1,65 @@
 from libs.rag_base.graphs.graph_build import app as graph_app
-from libs.rag_base.graphs.graph_defs import set_global_vectorstore
+from libs.rag_base.graphs.graph_defs import REVIEW_DELTA_EVENT, RAG_GENERATION_TAG
 import traceback
 
 class LangGraphWrapper:
     """LangGraph的封装类，简化对LangGraph的调用"""
     
-    def __init__(self, vectorstore=None):
+    def __init__(self, vectorstore=None, parent_store=None):
         """初始化LangGraph包装器
         
         Args:
             vectorstore: 特定仓库的vectorstore实例
+            parent_store: vectorstore子块对应的父块映射，检索后用父块替换子块
         """
         self.vectorstore = vectorstore
-        # 将vectorstore设置为全局，供retriever_node使用
-        if vectorstore:
-            set_global_vectorstore(vectorstore)
-            print(f"已设置全局vectorstore供检索使用")
+        self.parent_store = parent_store
+    
+    def _run_config(self) -> dict:
+        """本次运行的配置：vectorstore和父块映射随每次运行传给retriever_node，
+        不经过进程级全局变量，图在await处切换到其他repo的请求时也不会检索错仓库"""
+        return {"configurable": {"vectorstore": self.vectorstore, "parent_store": self.parent_store}}
         
-    async def query(self, question: str) -> str:
+    async def query(self, question: str, question_embedding=None) -> str:
         """使用LangGraph执行查询并返回结果"""
+        generation, _ = await self.query_with_trace(question, question_embedding)
+        return generation
+
+    async def query_with_trace(self, question: str, question_embedding=None):
+        """使用LangGraph执行查询，返回(结果, 产生结果的最后一个节点名)
+
+        最后节点为generate_node时表示结果通过了幻觉检测（no_hallucination路径）。
+        question_embedding: 调用方已计算的问题向量，传入后图内不再重复嵌入。
+        """
         if not question:
-            return "请提供有效的问题"
+            return "请提供有效的问题", None
         
         try:
             # 构建输入参数
             inputs = {"question": question}
+            if question_embedding is not None:
+                inputs["question_embedding"] = list(question_embedding)
             generation = None
+            final_node = None
             
-            # 执行图并获取结果
-            for output in graph_app.stream(inputs):
+            # 执行图直到结束，保留最后一次生成的结果（幻觉检测可能改走review_by_llm_node）
+            async for output in graph_app.astream(inputs, config=self._run_config()):
                 try:
                     for key, value in output.items():
-                        if "generation" in value:
+                        if value and "generation" in value:
                             generation = value["generation"]
-                            break
+                            final_node = key
                 except Exception as inner_e:
                     # 捕获处理每个输出项时可能发生的错误
                     print(f"处理图输出时出错: {str(inner_e)}")
                     continue
-                if generation:
-                    break
             
             # 如果没有生成结果，使用默认值
             if not generation:
                 generation = "抱歉，无法回答这个问题。"
+                final_node = None
             
-            return generation
+            return generation, final_node
         except Exception as e:
             error_message = str(e)
             error_traceback = traceback.format_exc()
@@ -53,14 +67,65 @@ class LangGraphWrapper:
             print(f"错误详情:\n{error_traceback}")
             # 特殊处理binary_only_pr情况
             if "binary_only_pr" in error_message:
-                return "PR只包含二进制文件的更改，不需要进行代码审查。"
-            return f"查询过程中发生错误: {error_message}"
+                return "PR只包含二进制文件的更改，不需要进行代码审查。", None
+            return f"查询过程中发生错误: {error_message}", None
+    
+    async def astream_query(self, question: str, question_embedding=None):
+        """流式执行查询，逐个产出事件字典
+
+        - {"type": "token", "node": 节点名, "text": 增量文本}：generate_node/review_by_llm_node生成过程中的增量输出，仅供预览
+        - {"type": "final", "node": 节点名, "text": 最终结果}：最后一个事件，内容以此为准
+          （例如幻觉检测失败后会改用review_by_llm_node的结果）
+        """
+        if not question:
+            yield {"type": "final", "node": None, "text": "请提供有效的问题"}
+            return
+        
+        inputs = {"question": question}
+        if question_embedding is not None:
+            inputs["question_embedding"] = list(question_embedding)
+        generation = None
+        final_node = None
+        
+        try:
+            async for event in graph_app.astream_events(inputs, config=self._run_config(), version="v2"):
+                kind = event["event"]
+                node = event.get("metadata", {}).get("langgraph_node")
+                if kind == "on_chat_model_stream" and RAG_GENERATION_TAG in event.get("tags", ()):
+                    # 只转发RAG生成调用的token；generate_node内的幻觉检测等评分模型也会流式输出，不能当作预览
+                    text = event["data"]["chunk"].content
+                    if text:
+                        yield {"type": "token", "node": node, "text": text}
+                elif kind == "on_custom_event" and event["name"] == REVIEW_DELTA_EVENT:
+                    # review_by_llm_node派发的审查预览增量
+                    text = event["data"].get("text")
+                    if text:
+                        yield {"type": "token", "node": node or "review_by_llm_node", "text": text}
+                elif kind == "on_chain_end" and node and event["name"] == node:
+                    # 节点执行结束，记录最后一次生成的结果
+                    output = event["data"].get("output")
+                    if isinstance(output, dict) and output.get("generation"):
+                        generation = output["generation"]
+                        final_node = node
+        except Exception as e:
+            error_message = str(e)
+            print(f"LangGraph流式查询出错: {error_message}")
+            print(f"错误详情:\n{traceback.format_exc()}")
+            if "binary_only_pr" in error_message:
+                yield {"type": "final", "node": None, "text": "PR只包含二进制文件的更改，不需要进行代码审查。"}
+            else:
+                yield {"type": "final", "node": None, "text": f"查询过程中发生错误: {error_message}"}
+            return
+        
+        if not generation:
+            generation = "抱歉，无法回答这个问题。"
+            final_node = None
+        yield {"type": "final", "node": final_node, "text": generation}
     
-    def set_vectorstore(self, vectorstore):
-        """设置vectorstore并更新全局引用"""
+    def set_vectorstore(self, vectorstore, parent_store=None):
+        """设置之后查询使用的vectorstore及其父块映射"""
         self.vectorstore = vectorstore
-        set_global_vectorstore(vectorstore)
-        print(f"已更新全局vectorstore供检索使用")
+        self.parent_store = parent_store
     
     def get_status(self) -> dict:
         """获取LangGraph的状态信息"""
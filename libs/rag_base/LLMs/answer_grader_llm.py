@@ -4,7 +4,7 @@ from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_community.chat_models.tongyi import ChatTongyi
 
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
 
 
 # Data model
@@ -17,7 +17,7 @@ class GradeAnswer(BaseModel):
 
 
 # Initialize config manager and get API key
-config_manager = ConfigManager()
+config_manager = get_default_config_manager()
 dashscope_api_key = config_manager.get_dashscope_api_key()
 
 # LLM with function call
@@ -2,7 +2,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_community.chat_models.tongyi import ChatTongyi
 from pydantic import BaseModel, Field
 
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
 
 # Data model
 class GeneralAnswer(BaseModel):
@@ -14,7 +14,7 @@ class GeneralAnswer(BaseModel):
     )
 
 # Initialize config manager and get API key
-config_manager = ConfigManager()
+config_manager = get_default_config_manager()
 dashscope_api_key = config_manager.get_dashscope_api_key()
 
 # LLM with function call
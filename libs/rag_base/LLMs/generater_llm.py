@@ -4,7 +4,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_community.chat_models.tongyi import ChatTongyi
 
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
 
 # Custom RAG prompt focused on analyzing historical PR comments in relation to current PR code changes
 system_prompt = """You are a professional code review expert, responsible for analyzing the relevance of historical PR comments to current PR code changes.
@@ -38,7 +38,7 @@ prompt = ChatPromptTemplate.from_messages(
 )
 
 # Initialize config manager and get API key
-config_manager = ConfigManager()
+config_manager = get_default_config_manager()
 dashscope_api_key = config_manager.get_dashscope_api_key()
 
 # LLM
@@ -1,28 +1,25 @@
 ### Hallucination Grader
-from pydantic import BaseModel, Field
+import functools
+
+from pydantic import BaseModel, ConfigDict, Field
 
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
 from langchain_community.chat_models.tongyi import ChatTongyi
 
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
+from libs.rag_base.LLMs.structured_output_utils import trusted_structured_output, yes_no_grader
 
 # Data model
 class GradeHallucinations(BaseModel):
     """Binary score for hallucination present in generation answer."""
 
+    model_config = ConfigDict(frozen=True)
+
     binary_score: str = Field(
         description="Answer is grounded in the facts, 'yes' or 'no'"
     )
 
-# Initialize config manager and get API key
-config_manager = ConfigManager()
-dashscope_api_key = config_manager.get_dashscope_api_key()
-
-
-# LLM with function call
-llm = ChatTongyi(model="qwen3-coder-plus", temperature=0, dashscope_api_key=dashscope_api_key)
-structured_llm_grader = llm.with_structured_output(GradeHallucinations)
-
 # Prompt
 system = """You are a highly precise fact-checker specialized in identifying hallucinations in LLM-generated content, specifically for code review PR analysis.
 Your task is to determine whether the provided LLM generation is fully grounded in and supported by both the given question and set of retrieved historical PR documents.
@@ -52,12 +49,34 @@ A hallucination occurs when the LLM generation contains information that is:
 - If question asks about performance problems, documents state "In PR #456, reviewers noted excessive memory usage in data processing functions" and generation says "Historical reviews identified resource utilization concerns in similar data processing implementations" → YES (reasonable inference)
 
 **Response Requirement:** Provide only 'yes' or 'no' as your final determination."""
-hallucination_prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", system),
-        ("human", "Question: \n\n {question} \n\n Retrieved historical PR documents: \n\n {documents} \n\n LLM generation: {generation}"),
-    ]
-)
-
-hallucination_grader = hallucination_prompt | structured_llm_grader
+
+
+@functools.lru_cache(maxsize=1)
+def _build_hallucination_grader() -> Runnable:
+    """Build the hallucination grader chain once and reuse it for every later access."""
+    # Initialize config manager and get API key
+    config_manager = get_default_config_manager()
+    dashscope_api_key = config_manager.get_dashscope_api_key()
+
+    # LLM with function call
+    llm = ChatTongyi(model="qwen3-coder-plus", temperature=0, dashscope_api_key=dashscope_api_key)
+    structured_llm_grader = trusted_structured_output(llm, GradeHallucinations)
+
+    hallucination_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system),
+            ("human", "Question: \n\n {question} \n\n Retrieved historical PR documents: \n\n {documents} \n\n LLM generation: {generation}"),
+        ]
+    )
+
+    # Single-token yes/no answer first, full structured output only as a fallback
+    return yes_no_grader(hallucination_prompt, llm, GradeHallucinations, hallucination_prompt | structured_llm_grader)
+
+
+def __getattr__(name: str) -> Runnable:
+    # PEP 562: build `hallucination_grader` lazily on first access instead of at import time
+    if name == "hallucination_grader":
+        return _build_hallucination_grader()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 #hallucination_grader.invoke({"documents": docs, "generation": generation})
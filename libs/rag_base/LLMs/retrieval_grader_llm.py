@@ -1,28 +1,27 @@
 ### Retrieval Grader
+import functools
+from typing import List, Optional, Sequence, Tuple
 
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
 from langchain_community.chat_models.tongyi import ChatTongyi
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
+from libs.rag_base.LLMs.structured_output_utils import trusted_structured_output, yes_no_grader
 
 # Data model
 class GradeDocuments(BaseModel):
     """Binary score for relevance check on retrieved documents."""
 
+    model_config = ConfigDict(frozen=True)
+
     binary_score: str = Field(
         description="Documents are relevant to the question, 'yes' or 'no'"
     )
 
 
-# Initialize config manager and get API key
-config_manager = ConfigManager()
-dashscope_api_key = config_manager.get_dashscope_api_key()
-
-# LLM with function call
-llm = ChatTongyi(model="qwen-plus", temperature=0, dashscope_api_key=dashscope_api_key)
-structured_llm_grader = llm.with_structured_output(GradeDocuments)
-
 # Prompt
 system = """You are a grader assessing relevance of a retrieved review comment to current PR code changes. 
 Your task is to determine if a historical PR review comment might be relevant to the current PR's code changes,
@@ -38,16 +37,65 @@ Grade 'yes' if the comment appears relevant to the current code changes, especia
 might be repeating a mistake that was previously identified in another PR. Grade 'no' only if the comment is clearly unrelated.
 
 Give a binary score 'yes' or 'no' to indicate relevance."""
-grade_prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", system),
-        ("human", "Retrieved review comment: \n\n {document} \n\n Current PR code changes: {question}"),
-    ]
-)
-
-retrieval_grader = grade_prompt | structured_llm_grader
-# Test code (commented out)
-# question = "agent memory"
-# docs = retriever.invoke(question)
-# doc_txt = docs[1].page_content
-# print(retrieval_grader.invoke({"question": question, "document": doc_txt}))
+
+
+@functools.lru_cache(maxsize=1)
+def _build_retrieval_grader() -> Runnable:
+    """Build the retrieval grader chain once and reuse it for every later access."""
+    # Initialize config manager and get API key
+    config_manager = get_default_config_manager()
+    dashscope_api_key = config_manager.get_dashscope_api_key()
+
+    # LLM with function call
+    llm = ChatTongyi(model="qwen-plus", temperature=0, dashscope_api_key=dashscope_api_key)
+    structured_llm_grader = trusted_structured_output(llm, GradeDocuments)
+
+    grade_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system),
+            ("human", "Retrieved review comment: \n\n {document} \n\n Current PR code changes: {question}"),
+        ]
+    )
+
+    # Single-token yes/no answer first, full structured output only as a fallback
+    return yes_no_grader(grade_prompt, llm, GradeDocuments, grade_prompt | structured_llm_grader)
+
+
+def __getattr__(name: str) -> Runnable:
+    # PEP 562: build `retrieval_grader` lazily on first access instead of at import time
+    if name == "retrieval_grader":
+        return _build_retrieval_grader()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Default max number of grading requests in flight at once, to stay within DashScope rate limits;
+# override with `grader_max_concurrency` in the config file
+GRADER_CONCURRENCY = 8
+
+
+@functools.lru_cache(maxsize=1)
+def _configured_concurrency() -> int:
+    value = get_default_config_manager().get_config_value("grader_max_concurrency", GRADER_CONCURRENCY)
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return GRADER_CONCURRENCY
+
+
+async def grade_docs_parallel(
+    question: str, docs: Sequence[Document], concurrency: Optional[int] = None
+) -> List[Tuple[Document, GradeDocuments]]:
+    """Grade retrieved documents concurrently, at most `concurrency` requests at a time.
+
+    `concurrency` defaults to the configured `grader_max_concurrency`.
+
+    Returns (document, grade) pairs in the same order as `docs`.
+    """
+    if not docs:
+        return []
+    inputs = [{"question": question, "document": d.page_content} for d in docs]
+    # Runnable.abatch caps in-flight requests with max_concurrency and keeps input order
+    grades = await _build_retrieval_grader().abatch(
+        inputs, config={"max_concurrency": concurrency or _configured_concurrency()}
+    )
+    return list(zip(docs, grades))
@@ -1,32 +1,34 @@
 ### Router
-
-from typing import Literal
+import re
+import functools
+from typing import Any, Dict, Literal, Optional
 
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
 from langchain_community.chat_models.tongyi import ChatTongyi
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
+from libs.rag_base.LLMs.structured_output_utils import trusted_structured_output
 
 
 # Data model
 class RouteQuery(BaseModel):
     """Route a user query to the most relevant datasource."""
 
+    model_config = ConfigDict(frozen=True)
+
     datasource: Literal["vectorstore", "general_question"] = Field(
         ...,
         description="Given a user question choose to route it to general question answer or a vectorstore.",
     )
 
 
-# Initialize config manager and get API key
-config_manager = ConfigManager()
-dashscope_api_key = config_manager.get_dashscope_api_key()
+# Queries matching these patterns are always about a PR, no LLM call needed
+_PR_URL_RE = re.compile(r"github\.com/[\w.-]+/[\w.-]+/pull/\d+", re.I)
+_PR_NUM_RE = re.compile(r"\b(?:PR|pull\s*request)\s*#?\s*\d+", re.I)
 
-# LLM with function call
-llm = ChatTongyi(model="qwen-plus", temperature=0, dashscope_api_key=dashscope_api_key)
-structured_llm_router = llm.with_structured_output(RouteQuery)
 
 # Prompt
 system = """You are an expert at routing a user query to the most appropriate datasource.
@@ -49,14 +51,51 @@ The vectorstore contains merged PRs data including PR IDs, descriptions, general
 
 ## Response Format:
 Respond with the appropriate datasource based strictly on the above rules."""
-route_prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", system),
-        ("human", "{question}"),
-    ]
-)
-
-question_router = route_prompt | structured_llm_router
+
+
+@functools.lru_cache(maxsize=1)
+def _build_question_router() -> Runnable:
+    """Build the question router chain once and reuse it for every later access."""
+    # Initialize config manager and get API key
+    config_manager = get_default_config_manager()
+    dashscope_api_key = config_manager.get_dashscope_api_key()
+
+    # LLM with function call
+    llm = ChatTongyi(model="qwen-plus", temperature=0, dashscope_api_key=dashscope_api_key)
+    structured_llm_router = trusted_structured_output(llm, RouteQuery)
+
+    route_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system),
+            ("human", "{question}"),
+        ]
+    )
+
+    return route_prompt | structured_llm_router
+
+
+class HybridRouter:
+    """Route PR URLs / PR numbers by regex and only ask the LLM router for everything else."""
+
+    def _fast_route(self, question: str) -> Optional[RouteQuery]:
+        if _PR_URL_RE.search(question) or _PR_NUM_RE.search(question):
+            return RouteQuery(datasource="vectorstore")
+        return None
+
+    def invoke(self, d: Dict[str, Any]) -> RouteQuery:
+        route = self._fast_route(d["question"])
+        if route is not None:
+            return route
+        return _build_question_router().invoke(d)
+
+    async def ainvoke(self, d: Dict[str, Any]) -> RouteQuery:
+        route = self._fast_route(d["question"])
+        if route is not None:
+            return route
+        return await _build_question_router().ainvoke(d)
+
+
+question_router = HybridRouter()
 
 # example:
 # print(
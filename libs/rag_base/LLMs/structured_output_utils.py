@@ -0,0 +1,62 @@
+### Structured output helpers
+
+from typing import Type, TypeVar
+
+from pydantic import BaseModel
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def trusted_structured_output(llm: BaseChatModel, schema: Type[ModelT]) -> Runnable:
+    """Like `llm.with_structured_output(schema)` but builds the result with `model_construct`.
+
+    The graders only return tiny, fixed-shape tool calls, so the arguments are trusted
+    as-is instead of running full Pydantic validation on every call.
+    """
+    # DashScope only accepts "auto", "none" or a function object for tool_choice (not "any"),
+    # so the grader tool is forced by name
+    tool_llm = llm.bind_tools(
+        [schema], tool_choice={"type": "function", "function": {"name": schema.__name__}}
+    )
+    field_names = tuple(schema.model_fields)
+
+    def _parse(message: AIMessage) -> ModelT:
+        tool_calls = getattr(message, "tool_calls", None)
+        if not tool_calls:
+            raise OutputParserException(
+                f"Expected a {schema.__name__} tool call, got: {message.content!r}"
+            )
+        args = tool_calls[0]["args"]
+        return schema.model_construct(**{name: args[name] for name in field_names if name in args})
+
+    return tool_llm | RunnableLambda(_parse)
+
+
+# Appended to a grader prompt so the answer fits in a single output token
+_YES_NO_INSTRUCTION = "Answer with exactly one word: yes or no."
+
+
+def yes_no_grader(
+    prompt: ChatPromptTemplate, llm: BaseChatModel, schema: Type[ModelT], structured_chain: Runnable
+) -> Runnable:
+    """Binary grader that asks for a single `yes`/`no` token instead of a JSON tool call.
+
+    The reply is wrapped into `schema` (which must have a `binary_score` field). Anything other
+    than a clear yes/no, or any API error, falls back to `structured_chain`.
+    """
+
+    def _parse(message: AIMessage) -> ModelT:
+        answer = message.content.strip().lower() if isinstance(message.content, str) else ""
+        if answer.startswith("y"):
+            return schema.model_construct(binary_score="yes")
+        if answer.startswith("n"):
+            return schema.model_construct(binary_score="no")
+        raise OutputParserException(f"Expected 'yes' or 'no', got: {message.content!r}")
+
+    fast_chain = (prompt + [("human", _YES_NO_INSTRUCTION)]) | llm.bind(max_tokens=1) | RunnableLambda(_parse)
+    return fast_chain.with_fallbacks([structured_chain])
@@ -1,6 +1,27 @@
 from .graph_defs import GraphState, get_pr_node, general_question_node, retriever_node, grader_node, generate_node, review_by_llm_node, binary_only_end_node, invalid_pr_node, error_pr_node, condition_route_question, condition_check_pr_state, condition_decide_to_generate, condition_hallucination_evaluation
 from langgraph.graph import END, StateGraph, START
 
+# 条件边的路由表，模块级常量，编译时只解析一次
+# （langgraph只接受dict/list作为path_map，因此不能换成MappingProxyType）
+ROUTE_QUESTION_MAP = {
+    "general_question": "general_question_node",
+    "vectorstore": "get_pr_node",
+}
+CHECK_PR_STATE_MAP = {
+    "valid_pr": "retriever_node",
+    "invalid_pr": "invalid_pr_node",
+    "binary_only_pr": "binary_only_end_node",
+    "error_pr": "error_pr_node",
+}
+DECIDE_TO_GENERATE_MAP = {
+    "review_by_llm": "review_by_llm_node",
+    "generate": "generate_node",
+}
+HALLUCINATION_EVALUATION_MAP = {
+    "no_hallucination": END,
+    "hallucination": "review_by_llm_node",
+}
+
 workflow = StateGraph(GraphState)
 
 # Define the nodes
@@ -18,10 +39,7 @@ workflow.add_node("error_pr_node", error_pr_node)  # 处理获取PR失败
 workflow.add_conditional_edges(
     START,
     condition_route_question,
-    {
-        "general_question": "general_question_node",
-        "vectorstore": "get_pr_node",
-    },
+    ROUTE_QUESTION_MAP,
 )
 
 # 处理一般问题路径
@@ -31,12 +49,7 @@ workflow.add_edge("general_question_node", END)
 workflow.add_conditional_edges(
     "get_pr_node",
     condition_check_pr_state,
-    {
-        "valid_pr": "retriever_node",
-        "invalid_pr": "invalid_pr_node",
-        "binary_only_pr": "binary_only_end_node",
-        "error_pr": "error_pr_node",
-    },
+    CHECK_PR_STATE_MAP,
 )
 
 # 添加二进制文件PR处理路径
@@ -55,24 +68,18 @@ workflow.add_edge("retriever_node", "grader_node")
 workflow.add_conditional_edges(
     "grader_node",
     condition_decide_to_generate,
-    {
-        "review_by_llm": "review_by_llm_node",
-        "generate": "generate_node",
-    },
+    DECIDE_TO_GENERATE_MAP,
 )
 
 # 幻觉检测路径
 workflow.add_conditional_edges(
     "generate_node",
     condition_hallucination_evaluation,
-    {
-        "no_hallucination": END,
-        "hallucination": "review_by_llm_node",
-    },
+    HALLUCINATION_EVALUATION_MAP,
 )
 
 # 最终路径到结束
 workflow.add_edge("review_by_llm_node", END)
 
-# Compile
-app = workflow.compile()
+# Compile - 只在导入时编译一次；不使用checkpointer，避免每步保存状态
+app = workflow.compile(checkpointer=None, debug=False)
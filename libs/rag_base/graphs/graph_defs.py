@@ -1,37 +1,89 @@
 import os
 import re
+import uuid
+import shutil
+import asyncio
 import json
+import time
 import logging
+import functools
+import statistics
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from pprint import pformat
 from typing import List
 
 from typing_extensions import TypedDict
-from libs.rag_base.LLMs.router_question_llm import question_router
-from libs.rag_base.LLMs.retrieval_grader_llm import retrieval_grader
-from libs.rag_base.LLMs.generater_llm import format_docs, rag_chain
-from libs.rag_base.LLMs.hallucination_grader_llm import hallucination_grader
-from libs.rag_base.LLMs.answer_grader_llm import answer_grader
-from libs.rag_base.knowledge_base.build_rag_base import retriever_wrapper
+from libs.rag_base.LLMs import router_question_llm, retrieval_grader_llm
+from libs.rag_base.LLMs import hallucination_grader_llm
+from libs.rag_base.knowledge_base.dedupe import dedupe_documents
 from typing import Optional
 
-# 全局vectorstore引用，可在初始化时设置
-_global_vectorstore = None
+__all__ = [
+    "GraphState",
+    "format_as_mindmap",
+    "REVIEW_DELTA_EVENT",
+    "RAG_GENERATION_TAG",
+    "install_llm_cache",
+    "aget_pr_details",
+    # nodes
+    "get_pr_node",
+    "retriever_node",
+    "grader_node",
+    "generate_node",
+    "review_by_llm_node",
+    "general_question_node",
+    "binary_only_end_node",
+    "invalid_pr_node",
+    "error_pr_node",
+    # edges
+    "condition_route_question",
+    "condition_check_pr_state",
+    "condition_decide_to_generate",
+    "condition_hallucination_evaluation",
+]
+
+# 检索结果缓存：(id(vectorstore), 查询文本或多路查询元组, k) -> (过期时间, vectorstore弱引用, 文档列表)
+_SEARCH_CACHE_SIZE = 256
+_SEARCH_CACHE_TTL = 300  # 秒
+_search_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_search_cache_lock = threading.RLock()
+
+def _prune_search_cache():
+    """清除已过期或所属vectorstore已被释放的缓存项"""
+    now = time.monotonic()
+    with _search_cache_lock:
+        stale = [key for key, (expires, store_ref, _) in _search_cache.items() if expires <= now or store_ref() is None]
+        for key in stale:
+            del _search_cache[key]
+
+def _cached_similarity_search(vectorstore, query: str, k: int, search):
+    """带LRU+TTL缓存的检索，search为实际执行检索的无参函数"""
+    key = (id(vectorstore), query, k)
+    now = time.monotonic()
+    with _search_cache_lock:
+        entry = _search_cache.get(key)
+        # 校验弱引用，防止vectorstore被释放后id被新对象复用
+        if entry is not None and entry[0] > now and entry[1]() is vectorstore:
+            _search_cache.move_to_end(key)
+            return list(entry[2])
+    docs = search()
+    # 顺便清理已过期或所属vectorstore已被释放（重建/淘汰）的缓存项
+    _prune_search_cache()
+    with _search_cache_lock:
+        _search_cache[key] = (now + _SEARCH_CACHE_TTL, weakref.ref(vectorstore), list(docs))
+        _search_cache.move_to_end(key)
+        while len(_search_cache) > _SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+    return docs
 
-def set_global_vectorstore(vectorstore):
-    """设置全局vectorstore，供retriever_node使用"""
-    global _global_vectorstore
-    _global_vectorstore = vectorstore
-
-def get_global_vectorstore():
-    """获取全局vectorstore"""
-    global _global_vectorstore
-    return _global_vectorstore
-
-from libs.rag_base.LLMs.general_reviewer_llm import general_reviewer
-from libs.rag_base.LLMs.general_question_llm import general_question_chain
-from pprint import pprint
 from langchain.schema import Document
-from util.config_manager import ConfigManager
+from langchain_core.callbacks.manager import adispatch_custom_event
+from langchain_core.runnables import RunnableConfig
+from util.config_manager import get_default_config_manager
 
 # Import PR tools
 from libs.pr_helper.github_pr_to_excel import GitHubPRToExcelExporter
@@ -40,6 +92,126 @@ from libs.pr_helper.pr_files_pre_downloader import PRFilesPreDownloader
 # 配置日志
 logger = logging.getLogger("PR_REVIEW_APP")
 
+def install_llm_cache():
+    """按配置启用LangChain全局LLM缓存（SQLite），相同提示词的重复调用直接返回缓存结果
+
+    由后端启动时调用，配置项llm_cache_enabled默认为false（不启用）；
+    缓存数据库放在PR审查数据目录下，不依赖进程的当前工作目录。
+    """
+    config_manager = get_default_config_manager()
+    if not config_manager.get_config_value("llm_cache_enabled", False):
+        return
+    data_dir = config_manager.get_pr_review_data_dir()
+    os.makedirs(data_dir, exist_ok=True)
+    cache_path = os.path.join(data_dir, ".langchain_cache.db")
+    from langchain_core.globals import set_llm_cache
+    from langchain_community.cache import SQLiteCache
+    set_llm_cache(SQLiteCache(database_path=cache_path))
+    logger.info(f"已启用LLM缓存: {cache_path}")
+
+### Lazy loaders ###
+# 这些模块在导入时就会创建LLM链或向量库，推迟到第一次使用时再导入，
+# 只走部分路径的进程（例如只处理一般问题）不必加载全部依赖
+
+# generate_node中RAG生成调用的标签：astream_events按此标签挑出生成答案的token，
+# 同一节点内幻觉/答案评分模型的输出不带该标签
+RAG_GENERATION_TAG = "rag_generation"
+
+@functools.lru_cache(maxsize=1)
+def _rag_chain():
+    from libs.rag_base.LLMs.generater_llm import rag_chain
+    return rag_chain.with_config(tags=[RAG_GENERATION_TAG])
+
+@functools.lru_cache(maxsize=1)
+def _general_reviewer():
+    from libs.rag_base.LLMs.general_reviewer_llm import general_reviewer
+    return general_reviewer
+
+@functools.lru_cache(maxsize=1)
+def _general_question_chain():
+    from libs.rag_base.LLMs.general_question_llm import general_question_chain
+    return general_question_chain
+
+@functools.lru_cache(maxsize=1)
+def _default_retriever():
+    """本次运行未传入vectorstore时使用的默认检索器"""
+    from libs.rag_base.knowledge_base.build_rag_base import retriever
+    return retriever
+
+@functools.lru_cache(maxsize=4)
+def _get_pr_clients(token: Optional[str]):
+    """按token缓存PR导出器和下载器，跨PR复用其HTTP会话和连接池"""
+    return GitHubPRToExcelExporter(token=token), PRFilesPreDownloader(token=token)
+
+def _github_token() -> Optional[str]:
+    """GitHub token：配置文件中的github_token，未设置时取环境变量GITHUB_TOKEN"""
+    return get_default_config_manager().get_github_token()
+
+# PR详情短期缓存：(owner, repo, PR编号) -> (过期时间, PR详情)
+# rag_service计算答案缓存键和get_pr_node先后读取同一个PR的详情，只请求一次GitHub API
+_PR_DETAILS_TTL = 60  # 秒
+_PR_DETAILS_CACHE_SIZE = 64
+_pr_details_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+async def aget_pr_details(owner: str, repo: str, pr_number: int) -> dict:
+    """获取PR详情（在线程中请求GitHub API），_PR_DETAILS_TTL秒内重复获取同一个PR时直接返回缓存结果"""
+    key = (owner.lower(), repo.lower(), int(pr_number))
+    now = time.monotonic()
+    entry = _pr_details_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    pr_exporter, _ = _get_pr_clients(_github_token())
+    pr_details = await asyncio.to_thread(pr_exporter.get_pr_details, owner, repo, int(pr_number))
+    _pr_details_cache[key] = (time.monotonic() + _PR_DETAILS_TTL, pr_details)
+    _pr_details_cache.move_to_end(key)
+    while len(_pr_details_cache) > _PR_DETAILS_CACHE_SIZE:
+        _pr_details_cache.popitem(last=False)
+    return pr_details
+
+@functools.lru_cache(maxsize=1)
+def _pr_review_data_dir() -> str:
+    """PR审查数据目录路径，只在首次使用时读取一次配置文件"""
+    return get_default_config_manager().get_pr_review_data_dir()
+
+@functools.lru_cache(maxsize=1)
+def _grader_top_k() -> int:
+    """grader_node收集到这么多相关文档后停止评分，配置项grader_top_k，默认与检索保留数量一致"""
+    value = get_default_config_manager().get_config_value("grader_top_k", RETRIEVE_MAX_DOCS)
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return RETRIEVE_MAX_DOCS
+
+# 优先使用orjson解析代码示例中的JSON字符串，未安装时退回标准库
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# 修复包含bash命令的JSON字符串的工具函数（可选模块，不存在时跳过修复）
+try:
+    from .audit_json_bash_fixed import audit_and_fix_bash_json
+except ImportError:
+    audit_and_fix_bash_json = None
+
+# PR URL格式，例如 https://github.com/owner/repo/pull/123，分组依次为owner、repo、PR编号
+_PR_URL_RE = re.compile(r'https://github\.com/([\w-]+)/([\w-]+)/pull/(\d+)')
+# 文档内容中的PR ID行，例如 "PR ID: 123"
+_PR_ID_RE = re.compile(r'PR ID: (\d+)')
+
+# diff中代码变更行（新增、删除、hunk头）的前缀
+_DIFF_PREFIXES = ('+', '-', '@@')
+
+# git diff中二进制文件变更的标记，例如 "Binary files a/x.png and b/x.png differ"
+_BINARY_MARKER = "Binary files"
+
+# 审查时不读取的二进制文件扩展名（diff中已标记为Binary files）
+_BINARY_EXTENSIONS = frozenset({
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.pdf',
+    '.zip', '.gz', '.tar', '.jar', '.bin', '.exe', '.dll', '.so', '.dylib', '.class',
+})
+
 class GraphState(TypedDict):
     """
     Represents the state of our graph.
@@ -54,6 +226,9 @@ class GraphState(TypedDict):
         pr_state: current PR state
         pr_diff: current PR code changes
         pr_files: current PR files path
+        question_embedding: embedding of the question, when the caller already computed one
+        binary_files_count: number of binary file changes in the PR diff
+        total_files_count: number of PR files downloaded to pr_files
     """
 
     question: str
@@ -66,11 +241,216 @@ class GraphState(TypedDict):
     pr_state: str # current PR state
     pr_diff: str # current PR code changes
     pr_files: str # current PR files path
+    question_embedding: Optional[List[float]] # caller-supplied question embedding, reused by retrieval
+    binary_files_count: int # binary file changes in the PR diff
+    total_files_count: int # PR files downloaded to pr_files
+
+
+### Diff helpers ###
+
+# 提取diff上下文时最多扫描的字符数，超大PR的diff也只处理开头这一段
+_DIFF_SCAN_MAX_CHARS = 200_000
+
+def _iter_diff_lines(pr_diff: str, limit: Optional[int] = None):
+    """按行惰性遍历diff，不一次性split出所有行；与splitlines()一样兼容CRLF换行
+
+    limit不为None时只遍历前limit个字符（不复制字符串），最后一行可能被截断。
+    """
+    start = 0
+    length = len(pr_diff) if limit is None else min(len(pr_diff), limit)
+    while start < length:
+        end = pr_diff.find('\n', start, length)
+        if end == -1:
+            end = length
+        line_end = end - 1 if end > start and pr_diff[end - 1] == '\r' else end
+        yield pr_diff[start:line_end]
+        start = end + 1
+
+
+def _extract_diff_context(pr_diff: str, max_lines: int) -> str:
+    """遍历diff，提取前max_lines行代码变更（+、-、@@开头的行），取满或扫描满_DIFF_SCAN_MAX_CHARS个字符后停止
+
+    Args:
+        pr_diff: PR的diff内容
+        max_lines: 最多保留的变更行数
+
+    Returns:
+        变更行拼接成的字符串
+    """
+    relevant = []
+    for line in _iter_diff_lines(pr_diff, _DIFF_SCAN_MAX_CHARS):
+        if line.startswith(_DIFF_PREFIXES):
+            relevant.append(line)
+            if len(relevant) >= max_lines:
+                break
+    return '\n'.join(relevant)
+
+
+### File helpers ###
+
+def _iter_files(path: str):
+    """基于os.scandir遍历目录下的文件，产出DirEntry（与os.walk的files一致）
+
+    与os.walk默认行为一致：不进入符号链接目录，无法读取的目录直接跳过。
+    """
+    stack = [path]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        stack.append(entry.path)
+                else:
+                    yield entry
+
+
+### PR cache helpers ###
+# 按head SHA缓存PR的diff和基础代码：{data_dir}/{owner}/{repo}/base_code/{pr_id}/{head_sha}/
+#   diff.txt    PR diff
+#   code/       PR修改前的基础代码文件
+#   files.json  下载成功的文件列表，最后写入，作为缓存完整的标记
+_PR_CACHE_DIFF = "diff.txt"
+_PR_CACHE_FILES = "files.json"
+_PR_CACHE_CODE = "code"
+_PR_CACHE_TMP_PREFIX = ".tmp-"
+# 超过该时间（秒）仍未重命名的临时目录视为进程中断遗留的，清理旧缓存时一并删除
+_PR_CACHE_TMP_MAX_AGE = 3600
+
+
+def _load_pr_cache(cache_dir: str):
+    """读取已完整缓存的PR，返回(diff, 文件列表)，缓存不存在或不完整时返回None"""
+    try:
+        files = json.loads(Path(cache_dir, _PR_CACHE_FILES).read_text(encoding="utf-8"))
+        pr_diff = Path(cache_dir, _PR_CACHE_DIFF).read_text(encoding="utf-8")
+    except (OSError, ValueError):
+        return None
+    return pr_diff, files
+
+
+def _store_pr_cache(pr_dir: str, tmp_dir: str, cache_dir: str, pr_diff: str, files: List[str], complete: bool) -> str:
+    """把临时目录中下载好的PR数据原子地重命名为缓存目录，返回最终使用的目录
+
+    只有下载完整时才写入files.json标记，不完整的结果下次会重新下载；
+    缓存完整写入后清理同一PR其他head SHA的旧缓存。
+    """
+    Path(tmp_dir, _PR_CACHE_DIFF).write_text(pr_diff, encoding="utf-8")
+    if complete:
+        Path(tmp_dir, _PR_CACHE_FILES).write_text(json.dumps(files), encoding="utf-8")
+    if os.path.exists(cache_dir):
+        if _load_pr_cache(cache_dir) is not None:
+            # 其他请求已经写好了完整缓存，丢弃本次的临时目录
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return cache_dir
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    try:
+        os.rename(tmp_dir, cache_dir)
+    except OSError:
+        if not os.path.isdir(cache_dir):
+            # 重命名因其他原因失败，只能使用本次的临时目录（过期后由清理删除）
+            return tmp_dir
+        # 并发请求抢先完成了重命名，改用它的缓存目录并删除本次的临时目录
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return cache_dir
+    if complete:
+        stale_before = time.time() - _PR_CACHE_TMP_MAX_AGE
+        with os.scandir(pr_dir) as it:
+            for entry in it:
+                if not entry.is_dir() or entry.path == cache_dir:
+                    continue
+                # 其他请求正在使用的临时目录保留，只删除过期遗留的
+                if entry.name.startswith(_PR_CACHE_TMP_PREFIX) and entry.stat().st_mtime > stale_before:
+                    continue
+                shutil.rmtree(entry.path, ignore_errors=True)
+    return cache_dir
+
+
+### Retrieval helpers ###
+
+# 初步检索的候选数量，以及筛选后最多保留的文档数量
+RETRIEVE_CANDIDATES = 10
+RETRIEVE_MAX_DOCS = 5
+# 检索提示中代码变更的字符上限，防止超长行使查询超出嵌入模型的输入长度
+SEARCH_DIFF_MAX_CHARS = 4000
+
+
+# 倒数排名融合(RRF)的平滑常数
+RRF_K = 60
+
+
+def _batch_search_by_vectors(vectorstore, embeddings: List[List[float]], k: int):
+    """一次提交多个查询向量，返回每个查询的[(Document, 距离)]列表
+
+    Chroma直接使用collection.query的批量接口（一次调用完成所有查询），
+    其他vectorstore退回到线程池逐个检索；两条路径返回的都是距离（越小越相关），
+    与similarity_search_with_score一致，不使用归一化后的相关度得分。
+    """
+    collection = getattr(vectorstore, "_collection", None)
+    if collection is not None:
+        results = collection.query(
+            query_embeddings=embeddings, n_results=k,
+            include=["documents", "metadatas", "distances"])
+        return [
+            [(Document(page_content=text, metadata=metadata or {}, id=doc_id), distance)
+             for doc_id, text, metadata, distance in zip(ids, texts, metadatas, distances)]
+            for ids, texts, metadatas, distances in zip(
+                results["ids"], results["documents"], results["metadatas"], results["distances"])
+        ]
+    with ThreadPoolExecutor(max_workers=len(embeddings)) as executor:
+        return list(executor.map(
+            lambda embedding: vectorstore.similarity_search_by_vector_with_score(embedding, k=k),
+            embeddings))
+
+
+def _reciprocal_rank_fusion(result_lists):
+    """按RRF合并多路检索结果，返回[(Document, 最小距离)]，顺序为融合得分从高到低"""
+    fused = {}
+    for results in result_lists:
+        for rank, (doc, distance) in enumerate(results):
+            key = doc.id or doc.page_content
+            entry = fused.get(key)
+            if entry is None:
+                fused[key] = [doc, distance, 1.0 / (RRF_K + rank + 1)]
+            else:
+                entry[1] = min(entry[1], distance)
+                entry[2] += 1.0 / (RRF_K + rank + 1)
+    ranked = sorted(fused.values(), key=lambda entry: entry[2], reverse=True)
+    return [(doc, distance) for doc, distance, _ in ranked]
+
+
+def _multi_query_search(vectorstore, queries: List[str], k: int):
+    """批量嵌入多路查询、批量检索并做RRF融合"""
+    embeddings = vectorstore.embeddings.embed_documents(queries)
+    return _reciprocal_rank_fusion(_batch_search_by_vectors(vectorstore, embeddings, k))
+
+
+def _has_review_comments(content: str) -> bool:
+    """检查文档是否包含完整的评论部分标记"""
+    return '## REVIEW COMMENTS START ##' in content and '## REVIEW COMMENTS END ##' in content
+
+
+def _select_by_adaptive_threshold(scored_docs):
+    """按得分分布自适应筛选检索结果
+
+    Chroma返回的是距离（越小越相关），保留距离不超过 mean + 0.5*std 的文档，
+    包含评论标记的文档排在前面，最多保留RETRIEVE_MAX_DOCS个。
+    """
+    if not scored_docs:
+        return []
+    distances = [score for _, score in scored_docs]
+    bar = statistics.fmean(distances) + 0.5 * statistics.pstdev(distances)
+    kept = [doc for doc, score in scored_docs if score <= bar]
+    # 稳定排序：保持相关度顺序的同时优先包含评论的文档
+    kept.sort(key=lambda doc: not _has_review_comments(doc.page_content))
+    return kept[:RETRIEVE_MAX_DOCS]
 
 
 ### Nodes ###
 
-def get_pr_node(state):
+async def get_pr_node(state):
     """
     Get PR information and download base code files.
 
@@ -85,8 +465,7 @@ def get_pr_node(state):
     
     # Parse PR URL to extract owner, repo and pr_number
     # Example URL: https://github.com/owner/repo/pull/123
-    pattern = r'https://github\.com/([\w-]+)/([\w-]+)/pull/(\d+)'
-    match = re.match(pattern, pr_url)
+    match = _PR_URL_RE.match(pr_url)
     
     if not match:
         logger.error(f"---ERROR: INVALID PR URL FORMAT: {pr_url}---")
@@ -95,43 +474,56 @@ def get_pr_node(state):
     owner, repo, pr_number = match.groups()
     pr_number = int(pr_number)
     
-    # Get GitHub token from environment if available
-    github_token = os.environ.get("GITHUB_TOKEN", None)
-    
     try:
-        # Initialize exporters
-        pr_exporter = GitHubPRToExcelExporter(token=github_token)
-        pr_downloader = PRFilesPreDownloader(token=github_token)
+        # Initialize exporters (same token source as the answer-cache lookup in rag_service)
+        pr_exporter, pr_downloader = _get_pr_clients(_github_token())
+        
+        pr_id = str(pr_number)
         
-        # Get PR details
+        # Get PR details first: the head SHA decides whether cached diff/base code can be reused
         logger.info(f"---GETTING PR #{pr_number} DETAILS---")
-        pr_details = pr_exporter.get_pr_details(owner, repo, pr_number)
+        pr_details = await aget_pr_details(owner, repo, pr_number)
+        head_sha = pr_details.get("head", {}).get("sha") or "unknown"
+        
+        # 使用配置管理器获取PR审查数据目录路径（进程内缓存）
+        data_dir = _pr_review_data_dir()
+        pr_dir = os.path.join(data_dir, owner, repo, "base_code", pr_id)
+        cache_dir = os.path.join(pr_dir, head_sha)
+        
+        cached = await asyncio.to_thread(_load_pr_cache, cache_dir)
+        if cached is not None:
+            logger.info(f"---USING CACHED DIFF AND BASE CODE FOR HEAD {head_sha}---")
+            pr_diff, downloaded_files = cached
+        else:
+            # 下载到临时目录，完成后原子地重命名为缓存目录
+            tmp_dir = os.path.join(pr_dir, f"{_PR_CACHE_TMP_PREFIX}{head_sha}-{uuid.uuid4().hex}")
+            os.makedirs(tmp_dir, exist_ok=True)
+            # diff和基础代码下载相互独立，放到线程中并发执行
+            logger.info(f"---DOWNLOADING PR DIFF AND BASE CODE TO {tmp_dir}---")
+            # 等两个下载都结束后再处理异常，避免删除临时目录时另一个线程仍在写入
+            pr_diff, downloaded_files = await asyncio.gather(
+                asyncio.to_thread(pr_exporter.get_pr_diff, owner, repo, pr_number),
+                asyncio.to_thread(pr_downloader.download_pr_files_before, owner, repo, pr_number,
+                                  os.path.join(tmp_dir, _PR_CACHE_CODE)),
+                return_exceptions=True,
+            )
+            for result in (pr_diff, downloaded_files):
+                if isinstance(result, BaseException):
+                    await asyncio.to_thread(shutil.rmtree, tmp_dir, True)
+                    raise result
+            # 有文件下载失败时不标记为完整缓存，下次重新下载
+            complete = head_sha != "unknown" and len(downloaded_files) == pr_details.get("changed_files")
+            cache_dir = await asyncio.to_thread(
+                _store_pr_cache, pr_dir, tmp_dir, cache_dir, pr_diff, downloaded_files, complete)
+        base_code_dir = os.path.join(cache_dir, _PR_CACHE_CODE)
         
         # Get PR status (open/closed)
         pr_state = pr_details.get("state", "unknown")
         logger.info(f"---PR STATUS: {pr_state.upper()}---")
         
-        # Get PR title, description and diff
+        # Get PR title and description
         pr_title = pr_details.get("title", "")
         pr_description = pr_details.get("body", "")
-        pr_diff = pr_exporter.get_pr_diff(owner, repo, pr_number)
-        
-        # Download PR base code files
-        pr_id = str(pr_number)
-        
-        # 使用配置管理器获取PR审查数据目录路径
-        config_manager = ConfigManager()
-        data_dir = config_manager.get_pr_review_data_dir()
-        base_code_dir = os.path.join(data_dir, owner, repo, "base_code", pr_id)
-        logger.info(f"---DOWNLOADING PR BASE CODE TO {base_code_dir}---")
-        
-        # Ensure the base code directory exists
-        os.makedirs(base_code_dir, exist_ok=True)
-        
-        # Download files
-        downloaded_files = pr_downloader.download_pr_files_before(
-            owner, repo, pr_number, base_code_dir
-        )
         
         logger.info(f"---SUCCESSFULLY DOWNLOADED {len(downloaded_files)} FILES---")
         
@@ -143,7 +535,10 @@ def get_pr_node(state):
             "pr_description": pr_description,
             "pr_state": pr_state,
             "pr_diff": pr_diff,
-            "pr_files": base_code_dir
+            "pr_files": base_code_dir,
+            # 在获取PR时一并统计，condition_check_pr_state直接使用，无需再扫描diff和遍历目录
+            "binary_files_count": pr_diff.count(_BINARY_MARKER),
+            "total_files_count": len(downloaded_files),
         }
         
         return updated_state
@@ -158,12 +553,14 @@ def get_pr_node(state):
         return updated_state
 
 
-def retriever_node(state):
+async def retriever_node(state, config: RunnableConfig):
     """
     Retrieve documents using question and PR diff (if available).
 
     Args:
         state (dict): The current graph state
+        config (RunnableConfig): run config; configurable["vectorstore"] / ["parent_store"]
+            hold the repo's vectorstore and parent store for this run
 
     Returns:
         state (dict): New key added to state, documents, that contains retrieved documents
@@ -179,26 +576,16 @@ def retriever_node(state):
         logger.info("---USING PR DIFF AS PART OF THE QUERY---")
         # Extract code changes with context from PR diff
         # Focus on the most important parts of the diff
-        diff_lines = pr_diff.split('\n')
-        # Filter for actual code changes (lines starting with +, -, or @@ for diff headers)
-        relevant_diff_lines = [line for line in diff_lines if line.startswith(('+', '-', '@@'))]
-        # Take up to 30 lines to get good context without being too long
-        filtered_diff = '\n'.join(relevant_diff_lines[:30])
-        
-        # Extract file names from diff headers
-        file_names = []
-        for line in diff_lines:
-            if line.startswith('+++') or line.startswith('---'):
-                parts = line.split('/')
-                if len(parts) > 0:
-                    file_names.append(parts[-1])
+        # Filter for actual code changes (lines starting with +, -, or @@ for diff headers),
+        # taking up to 30 lines to get good context without being too long
+        filtered_diff = _extract_diff_context(pr_diff, max_lines=30)[:SEARCH_DIFF_MAX_CHARS]
         
         # Create a targeted search prompt to find similar code changes and related review comments
         search_question = f"""Please find code changes similar to the following PR changes and their corresponding review comments:
             PR Title: {state["pr_title"]}
             PR Description: {state["pr_description"]}
             Code Changes:
-            {pr_diff}
+            {filtered_diff}
 
             Special Notes:
             1. Please retrieve the complete comment content between the markers ## REVIEW COMMENTS START ## and ## REVIEW COMMENTS END ##
@@ -208,30 +595,41 @@ def retriever_node(state):
         search_question = original_question
     
     # Retrieval
-    # 使用全局vectorstore（如果已设置）
-    vectorstore = get_global_vectorstore()
+    # 使用本次运行传入的vectorstore：每个请求各自携带，并发请求之间不会互相切换
+    configurable = (config or {}).get("configurable", {})
+    vectorstore = configurable.get("vectorstore")
     
     if vectorstore:
-        logger.info(f"---Using global vectorstore for retrieval---")
-        # 调整检索策略：先进行初步检索
-        initial_docs = vectorstore.similarity_search(search_question, k=5)
-        
-        # 过滤并排序文档，优先保留包含评论的文档
-        filtered_docs = []
-        for doc in initial_docs:
-            content = doc.page_content
-            # 检查是否包含评论部分标记
-            if '## REVIEW COMMENTS START ##' in content and '## REVIEW COMMENTS END ##' in content:
-                filtered_docs.append(doc)
-        
-        # 如果找到了包含评论的文档，使用这些；否则使用原始检索结果的前2个
-        if filtered_docs:
-            documents = filtered_docs[:2]  # 最多使用2个最相关的包含评论的文档
+        logger.info(f"---Using repo vectorstore for retrieval---")
+        # 调整检索策略：先检索较多候选，再按得分分布自适应筛选
+        # Chroma的检索接口是同步的，放到线程中执行，避免阻塞事件循环
+        question_embedding = state.get("question_embedding")
+        if search_question != original_question and vectorstore.embeddings is not None:
+            # PR审查：完整检索提示、标题、描述三路查询一次批量嵌入和检索，再按RRF融合
+            queries = list(dict.fromkeys(
+                q for q in (search_question, pr_title, state.get("pr_description", "")) if q and q.strip()))
+            scored_docs = await asyncio.to_thread(
+                _cached_similarity_search, vectorstore, tuple(queries), RETRIEVE_CANDIDATES,
+                lambda: _multi_query_search(vectorstore, queries, RETRIEVE_CANDIDATES))
+        elif search_question == original_question and question_embedding:
+            # 直接复用调用方已计算的问题向量，省去一次嵌入调用
+            scored_docs = await asyncio.to_thread(
+                _cached_similarity_search, vectorstore, search_question, RETRIEVE_CANDIDATES,
+                lambda: _batch_search_by_vectors(vectorstore, [question_embedding], RETRIEVE_CANDIDATES)[0])
         else:
-            documents = initial_docs[:2]
+            # 只在检索缓存未命中时才嵌入问题
+            scored_docs = await asyncio.to_thread(
+                _cached_similarity_search, vectorstore, search_question, RETRIEVE_CANDIDATES,
+                lambda: vectorstore.similarity_search_with_score(search_question, k=RETRIEVE_CANDIDATES))
+        
+        documents = _select_by_adaptive_threshold(scored_docs)
+        parent_store = configurable.get("parent_store")
+        if parent_store is not None:
+            # 命中的子块换回所属父块，同一父块只保留一次
+            documents = parent_store.expand(documents)
     else:
         logger.info(f"---Using default retriever for retrieval---")
-        documents = retriever.invoke(search_question)
+        documents = await asyncio.to_thread(_default_retriever().invoke, search_question)
     
     logger.info(f"---RETRIEVED {len(documents)} DOCUMENTS---")
     
@@ -240,7 +638,7 @@ def retriever_node(state):
     return updated_state
 
 
-def grader_node(state):
+async def grader_node(state):
     """
     Determines whether the retrieved documents are relevant to the question.
 
@@ -258,23 +656,28 @@ def grader_node(state):
     pr_title = state.get("pr_title", "")
     pr_files = state.get("pr_files", "")
 
-    # Score each doc
+    # Drop exact and near-duplicate documents so each is graded only once
+    unique_docs = dedupe_documents(documents)
+    if len(unique_docs) < len(documents):
+        logger.info(f"---SKIPPED {len(documents) - len(unique_docs)} DUPLICATE DOCUMENTS---")
+    documents = unique_docs
+
+    # Score docs page by page (each page concurrently), stopping once top_k relevant docs are found
+    top_k = _grader_top_k()
     filtered_docs = []
-    for d in documents:
-        score = retrieval_grader.invoke(
-            {"question": pr_diff, "document": d.page_content}
-        )
-        grade = score.binary_score
-        if grade == "yes":
-            logger.info("---GRADE: DOCUMENT RELEVANT---")
-            filtered_docs.append(d)
-        else:
-            logger.info("---GRADE: DOCUMENT NOT RELEVANT---")
-            continue
+    graded = 0
+    for start in range(0, len(documents), top_k):
+        results = await retrieval_grader_llm.grade_docs_parallel(pr_diff, documents[start:start + top_k])
+        graded += len(results)
+        filtered_docs.extend(d for d, score in results if score.binary_score == "yes")
+        if len(filtered_docs) >= top_k:
+            filtered_docs = filtered_docs[:top_k]
+            break
+    logger.info(f"---GRADE: {len(filtered_docs)}/{graded} DOCUMENTS RELEVANT ({len(documents)} RETRIEVED)---")
     return {"documents": filtered_docs, "question": question, "pr_diff": pr_diff, "pr_title": pr_title, "pr_files": pr_files}
 
 
-def generate_node(state):
+async def generate_node(state):
     """
     Generate answer based on relevant historical PR comments
 
@@ -295,15 +698,12 @@ def generate_node(state):
     # Extract PR IDs from documents and format documents with PR ID information
     formatted_docs_with_ids = []
     for doc in documents:
-        # Try to get PR ID from metadata first
-        pr_id = doc.metadata.get('pr_id', 'Unknown')
-        
-        # If not found in metadata, try to extract from page_content
-        if pr_id == 'Unknown':
-            import re
-            match = re.search(r'PR ID: (\d+)', doc.page_content)
-            if match:
-                pr_id = match.group(1)
+        # PR ID is stored in metadata at ingest time; only fall back to scanning
+        # page_content when it is missing or empty
+        pr_id = doc.metadata.get('pr_id')
+        if not pr_id:
+            match = _PR_ID_RE.search(doc.page_content)
+            pr_id = match.group(1) if match else 'Unknown'
         
         # Format document with PR ID information
         formatted_docs_with_ids.append(f"PR ID: {pr_id}\n{doc.page_content}")
@@ -313,9 +713,7 @@ def generate_node(state):
     
     # Create a comprehensive question that includes PR details and code changes
     # Extract key parts of the diff for better context
-    diff_lines = pr_diff.split('\n')
-    relevant_diff_lines = [line for line in diff_lines if line.startswith(('+', '-', '@@'))][:20]
-    filtered_diff = '\n'.join(relevant_diff_lines)
+    filtered_diff = _extract_diff_context(pr_diff, max_lines=20)
     
     # Format the question to focus on identifying repeated issues and include PR ID requirements
     question = f"""Analyze whether the current PR repeats errors or issues already found in historical PRs:
@@ -334,11 +732,55 @@ Please analyze whether questions or concerns mentioned in historical PR review c
 IMPORTANT REQUIREMENT: When referencing any historical PR review comments in your analysis, please always clearly indicate the corresponding historical PR ID from which the comment was extracted. For example: "From PR #123: 'This is a comment about...'"""
     
     # RAG generation
-    generation = rag_chain.invoke({"context": docs_txt, "question": question})
+    generation = await _rag_chain().ainvoke({"context": docs_txt, "question": question})
     
     return {"documents": documents, "question": question, "generation": generation}
 
 
+# 代码示例中可能是JSON编码的字符串的开头字符
+_JSON_PREFIXES = ('[', '{', '"')
+
+# 代码示例语言检测用的特征字符串
+_JINJA_MARKERS = ('{%', '{{')
+_BASH_SHEBANGS = ('#!/bin/bash', '#!/bin/sh')
+_BASH_MARKERS = ('$(', 'if [ ')            # 区分大小写，在原文中查找
+_BASH_MARKERS_LOWER = ('echo ', 'export ')  # 在小写文本中查找
+_BASH_LOOP_KEYWORDS = ('for ', 'while ')    # 与'do'同时出现时视为bash循环
+_C_MARKERS = ('#include',)
+_C_MARKERS_LOWER = ('int main', 'void ', 'class ', 'struct ', 'cout', 'printf', 'namespace std')
+_CPP_MARKERS_LOWER = ('cout', 'namespace std', 'class')
+
+
+def _detect_language(example: str, first_line: str) -> str:
+    """根据代码示例内容推断代码块语言，默认为python"""
+    # 检查是否包含Jinja2模板语法
+    if any(marker in example for marker in _JINJA_MARKERS):
+        return "jinja"
+    
+    example_lower = example.lower()
+    # 检测bash脚本
+    if (first_line.startswith(_BASH_SHEBANGS)
+            or any(marker in example for marker in _BASH_MARKERS)
+            or any(marker in example_lower for marker in _BASH_MARKERS_LOWER)
+            or ('do' in example_lower and any(keyword in example_lower for keyword in _BASH_LOOP_KEYWORDS))
+            or ('$' in example and ('{' in example or '}' in example))):  # 检测变量引用如${var}
+        return "bash"
+    
+    # 检测C/C++代码
+    if any(marker in example for marker in _C_MARKERS) or any(marker in example_lower for marker in _C_MARKERS_LOWER):
+        # 简单区分C和C++
+        if any(marker in example_lower for marker in _CPP_MARKERS_LOWER):
+            return "cpp"
+        return "c"
+    
+    return "python"
+
+
+def _indent(block: str, prefix: str = "  └── ") -> List[str]:
+    """把多行文本的每个非空行去掉首尾空白后加上前缀"""
+    return [f"{prefix}{stripped}" for stripped in (line.strip() for line in block.splitlines()) if stripped]
+
+
 def format_as_mindmap(comments):
     """
     将代码审查结果格式化为思维导图样式的可读文本
@@ -359,17 +801,13 @@ def format_as_mindmap(comments):
         for i, issue in enumerate(comments.specific_issues, 1):
             result.append(f"- 问题 {i}:")
             # 将问题文本按行分割，每行缩进展示
-            for line in issue.split('\n'):
-                if line.strip():
-                    result.append(f"  └── {line.strip()}")
+            result.extend(_indent(issue))
     
     if comments.improvement_suggestions:
         result.append("\n## 改进建议")
         for i, suggestion in enumerate(comments.improvement_suggestions, 1):
             result.append(f"- 建议 {i}:")
-            for line in suggestion.split('\n'):
-                if line.strip():
-                    result.append(f"  └── {line.strip()}")
+            result.extend(_indent(suggestion))
     
     if comments.code_examples:
         result.append("\n## 代码示例")
@@ -378,102 +816,95 @@ def format_as_mindmap(comments):
         logger.info(f"---CODE EXAMPLES: {comments.code_examples}---")
         # 处理可能包含JSON字符串的情况
         for item in comments.code_examples:
-            if isinstance(item, str):   
-                try:                
-                    # 尝试解析为JSON
-                    parsed_data = json.loads(item)
-                    
-                    # 如果解析成功并且是列表，直接扩展
-                    if isinstance(parsed_data, list):
-                        examples.extend(parsed_data)
-                    else:
-                        # 如果解析成功但不是列表，添加到示例中
-                        examples.append(str(parsed_data))
-                except (json.JSONDecodeError, ValueError, TypeError) as e:
-                    logger.info(f"---JSON解析失败，异常信息: {e}---")
-                    # 检查是否包含bash字符串，如果是则尝试修复
-                    if 'bash' in item:
-                        try:
-                            # 导入修复函数
-                            from .audit_json_bash_fixed import audit_and_fix_bash_json
-                            logger.info("---检测到bash命令，尝试修复JSON字符串---")
-                            # 修复包含bash命令的JSON字符串
-                            fixed_item = audit_and_fix_bash_json(item)
-                            # 尝试重新解析修复后的字符串
-                            parsed_fixed_data = json.loads(fixed_item)
-                            # 如果修复后解析成功，添加修复后的数据
-                            if isinstance(parsed_fixed_data, list):
-                                examples.extend(parsed_fixed_data)
-                            else:
-                                examples.append(str(parsed_fixed_data))
-                            continue
-                        except Exception as fix_e:
-                            logger.info(f"---修复JSON失败，异常信息: {fix_e}---")
-                    # 如果不包含bash字符串或修复失败，添加原始内容
-                    examples.append(item)
-            else:
+            if not isinstance(item, str):
                 # 如果不是字符串，转换为字符串后添加
                 examples.append(str(item))
+                continue
+            if not item.lstrip().startswith(_JSON_PREFIXES):
+                # 明显不是JSON（普通代码文本），跳过解析
+                examples.append(item)
+                continue
+            try:
+                # 尝试解析为JSON
+                parsed_data = _json_loads(item)
+                
+                # 如果解析成功并且是列表，直接扩展
+                if isinstance(parsed_data, list):
+                    examples.extend(parsed_data)
+                else:
+                    # 如果解析成功但不是列表，添加到示例中
+                    examples.append(str(parsed_data))
+            except (json.JSONDecodeError, ValueError, TypeError) as e:
+                logger.info(f"---JSON解析失败，异常信息: {e}---")
+                # 检查是否包含bash字符串，如果是则尝试修复
+                if audit_and_fix_bash_json is not None and 'bash' in item:
+                    try:
+                        logger.info("---检测到bash命令，尝试修复JSON字符串---")
+                        # 修复包含bash命令的JSON字符串
+                        fixed_item = audit_and_fix_bash_json(item)
+                        # 尝试重新解析修复后的字符串
+                        parsed_fixed_data = _json_loads(fixed_item)
+                        # 如果修复后解析成功，添加修复后的数据
+                        if isinstance(parsed_fixed_data, list):
+                            examples.extend(parsed_fixed_data)
+                        else:
+                            examples.append(str(parsed_fixed_data))
+                        continue
+                    except Exception as fix_e:
+                        logger.info(f"---修复JSON失败，异常信息: {fix_e}---")
+                # 如果不包含bash字符串或修复失败，添加原始内容
+                examples.append(item)
         
         # 遍历所有示例并格式化输出
         for i, example in enumerate(examples, 1):
             result.append(f"- 示例 {i}:")
             
+            # 只按行分割一次，语言检测和输出共用
+            code_lines = example.split('\n')
             # 检测代码语言（如果示例开头有#标记）
-            language = "python"  # 默认语言
-            first_line = example.split('\n')[0].strip()
-            example_lower = example.lower()
-            
-            # 检查是否包含Jinja2模板语法
-            if any(['{%' in line or '{{' in line for line in example.split('\n')]):
-                language = "jinja"
-            # 检测bash脚本
-            elif any([
-                first_line.startswith('#!/bin/bash'),
-                first_line.startswith('#!/bin/sh'),
-                '$(' in example,
-                'if [ ' in example,
-                'echo ' in example_lower,
-                'for ' in example_lower and 'do' in example_lower,
-                'while ' in example_lower and 'do' in example_lower,
-                '$' in example and ('{' in example or '}' in example),  # 检测变量引用如${var}
-                'export ' in example_lower
-            ]):
-                language = "bash"
-            # 检测C/C++代码
-            elif any([
-                '#include' in example,
-                'int main' in example_lower,
-                'void ' in example_lower,
-                'class ' in example_lower,
-                'struct ' in example_lower,
-                'cout' in example_lower,
-                'printf' in example_lower,
-                'namespace std' in example_lower
-            ]):
-                # 简单区分C和C++
-                if 'cout' in example_lower or 'namespace std' in example_lower or 'class' in example_lower:
-                    language = "cpp"
-                else:
-                    language = "c"
+            first_line = code_lines[0].strip()
+            language = _detect_language(example, first_line)
             
             # 如果第一行是```，则直接添加代码内容
             if not first_line.startswith('```'):
                 result.append(f"  ```{language}")
-                logger.info(f"  ```{language}")
             
-            code_lines = example.split('\n')
             for line in code_lines:
                 if line.strip():
                     result.append(f"  {line}")
-                    logger.info(f"  {line}")
             if not "```" in code_lines[-1]:
                 result.append("  ```")
-                logger.info("  ```")
     
-    return '\n'.join(result)
+    mindmap = '\n'.join(result)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("思维导图输出:\n%s", mindmap)
+    return mindmap
+
+# 并发读取PR基础代码文件的线程数
+PR_FILE_READ_WORKERS = 16
+
+def _read_pr_files(pr_files_path: str) -> str:
+    """读取PR基础代码目录下所有非二进制文件，拼接为一个字符串"""
+    # 遍历目录，找出所有非二进制文件
+    files = [
+        entry.path
+        for entry in _iter_files(pr_files_path)
+        if os.path.splitext(entry.name)[1].lower() not in _BINARY_EXTENSIONS
+    ]
+    # 多个文件时并发读取（网络存储上等待时间从累加变为取最大值），
+    # 以字节读取后一次性拼接、解码，避免字符串反复拼接
+    if len(files) > 1:
+        with ThreadPoolExecutor(max_workers=min(PR_FILE_READ_WORKERS, len(files))) as executor:
+            raw_parts = list(executor.map(Path.read_bytes, map(Path, files)))
+    else:
+        raw_parts = [Path(file).read_bytes() for file in files]
+    raw_content = b"\n\n".join(raw_parts) + (b"\n\n" if raw_parts else b"")
+    return raw_content.decode('utf-8', errors='replace')
 
-def review_by_llm_node(state):
+# review_by_llm_node流式输出审查预览时派发的自定义事件名
+REVIEW_DELTA_EVENT = "review_delta"
+
+async def review_by_llm_node(state, config: RunnableConfig):
     """
     Transform the query to produce a better question.
 
@@ -486,22 +917,26 @@ def review_by_llm_node(state):
 
     logger.info("---REVIEW BY LLM---")
     #logger.info(f"当前状态信息: {pformat(state)}")
-    question = f"Please review PR {state["question"]}, and give your comments on this PR"
+    question = f"Please review PR {state['question']}, and give your comments on this PR"
 
     # Re-write question
     pr_title = state['pr_title']
     pr_files_path = state['pr_files']
-    files = []
-    # 遍历目录，找出所有文件
-    for root, dirs, filenames in os.walk(pr_files_path):
-        for filename in filenames:
-            files.append(os.path.join(root, filename))
-    original_file_content = ""
-    for file in files:
-        with open(file, 'r') as f:
-            original_file_content += f.read() + "\n\n"
+    # 文件读取放到线程中执行，避免阻塞事件循环
+    original_file_content = await asyncio.to_thread(_read_pr_files, pr_files_path)
     code_diff = state['pr_diff']
-    general_comments = general_reviewer.invoke({"question": question, "pr_title": pr_title, "original_file_content": original_file_content, "code_diff": code_diff})
+    # 流式生成：每收到一个更完整的部分结果，就把预览文本的新增部分作为自定义事件发出，
+    # 调用方可通过astream_events提前展示（代码示例不参与预览，最终结果以节点输出为准）
+    general_comments = None
+    streamed = ""
+    async for partial in _general_reviewer().astream(
+            {"question": question, "pr_title": pr_title, "original_file_content": original_file_content, "code_diff": code_diff},
+            config=config):
+        general_comments = partial
+        preview = format_as_mindmap(partial.model_copy(update={"code_examples": None}))
+        if len(preview) > len(streamed) and preview.startswith(streamed):
+            await adispatch_custom_event(REVIEW_DELTA_EVENT, {"text": preview[len(streamed):]}, config=config)
+            streamed = preview
     
     # 处理code_examples字段，确保它是正确的类型
     if hasattr(general_comments, 'code_examples'):
@@ -518,25 +953,25 @@ def review_by_llm_node(state):
     return {"question": question, "generation": formatted_output}
 
 
-def general_question_node(state):
+async def general_question_node(state):
     """
-    Web search based on the re-phrased question.
+    Answer a general question directly with the LLM.
 
     Args:
         state (dict): The current graph state
 
     Returns:
-        state (dict): Updates documents key with appended web results
+        state (dict): Updates documents and generation keys with the answer
     """
 
     logger.info("---GENERAL QUESTION---")
     question = state["question"]
 
-    # Web search
-    docs = general_question_chain.invoke({"query": question})
-    web_results = "\n".join([d["content"] for d in docs])
+    # general_question_chain的提示词变量是question，返回结构化的GeneralAnswer
+    result = await _general_question_chain().ainvoke({"question": question})
+    answer = result.answer if result is not None else ""
 
-    return {"documents": [web_results], "question": question}
+    return {"documents": [answer], "question": question, "generation": answer}
 
 def binary_only_end_node(state):
     """
@@ -550,7 +985,8 @@ def binary_only_end_node(state):
     """
     # Add a message to state explaining why review is not needed
     logger.info("---PROCESSING BINARY-ONLY PR---")
-    logger.debug(f"二进制PR状态信息: {pformat(state)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("二进制PR状态信息: %s", pformat(state))
     state["generation"] = "PR只包含二进制文件的更改，不需要进行代码审查。"
     logger.info("---BINARY-ONLY PR PROCESSING COMPLETED---")
     return state
@@ -568,7 +1004,8 @@ def invalid_pr_node(state):
     """
     # Add a message to state explaining why review is not needed
     logger.info("---PROCESSING INVALID PR---")
-    logger.debug(f"无效PR状态信息: {pformat(state)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("无效PR状态信息: %s", pformat(state))
     state["generation"] = "当前PR非open状态，不需要进行代码审查。"
     logger.info(f"---INVALID PR PROCESSING COMPLETED: PR_STATE={state.get('pr_state', 'unknown')}---")
     return state
@@ -586,7 +1023,8 @@ def error_pr_node(state):
     """
     # Add a message to state explaining why review is not needed
     logger.info("---PROCESSING ERROR PR---")
-    logger.debug(f"错误PR状态信息: {pformat(state)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("错误PR状态信息: %s", pformat(state))
     error = state.get("error", "")
     state["generation"] = f"当前PR获取失败，错误信息：{error}。"
     logger.info(f"---ERROR PR PROCESSING COMPLETED: ERROR={error}---")
@@ -595,7 +1033,7 @@ def error_pr_node(state):
 
 ### Edges ###
 
-def condition_route_question(state):
+async def condition_route_question(state):
     """
     Route question to web search or RAG.
 
@@ -607,9 +1045,10 @@ def condition_route_question(state):
     """
 
     logger.info("---ROUTE QUESTION---")
-    logger.debug(f"当前状态信息: {pformat(state)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("当前状态信息: %s", pformat(state))
     question = state["question"]
-    source = question_router.invoke({"question": question})
+    source = await router_question_llm.question_router.ainvoke({"question": question})
     if source.datasource == "general_question":
         logger.info("---ROUTE QUESTION TO GENERAL QUESTION---")
         return "general_question"
@@ -634,24 +1073,9 @@ def condition_check_pr_state(state):
     
     # Check if PR is open
     if pr_state == "open":
-        # Get PR diff content
-        pr_diff = state.get("pr_diff", "")
-        code_diff = state.get("code_diff", "")
-        
-        # Combine all diff content for checking
-        all_diff = pr_diff + code_diff
-        
-        # Count occurrences of 'Binary files' in diff
-        binary_files_count = all_diff.count("Binary files")
-        
-        # Get PR files directory path
-        pr_files_path = state.get("pr_files", "")
-        
-        # Count total files in PR files directory
-        total_files_count = 0
-        if pr_files_path and os.path.exists(pr_files_path):
-            for root, dirs, files in os.walk(pr_files_path):
-                total_files_count += len(files)
+        # Binary change count and downloaded file count were computed by get_pr_node
+        binary_files_count = state.get("binary_files_count", 0)
+        total_files_count = state.get("total_files_count", 0)
         
         # Check if number of binary files matches total files count
         if binary_files_count > 0 and binary_files_count == total_files_count:
@@ -698,7 +1122,7 @@ def condition_decide_to_generate(state):
         return "generate"
 
 
-def condition_hallucination_evaluation(state):
+async def condition_hallucination_evaluation(state):
     """
     Determines whether the generation is grounded in the document and answers question.
 
@@ -714,7 +1138,7 @@ def condition_hallucination_evaluation(state):
     documents = state["documents"]
     generation = state["generation"]
 
-    score = hallucination_grader.invoke(
+    score = await hallucination_grader_llm.hallucination_grader.ainvoke(
         {"question": question, "documents": documents, "generation": generation}
     )
     grade = score.binary_score
@@ -1,14 +1,25 @@
-# Run
-inputs = {
-    "question": "What player at the Bears expected to draft first in the 2024 NFL draft?"
-}
-for output in app.stream(inputs):
-    for key, value in output.items():
-        # Node
-        pprint(f"Node '{key}':")
-        # Optional: print full state at each node
-        # pprint.pprint(value["keys"], indent=2, width=80, depth=None)
-    pprint("\n---\n")
-
-# Final generation
-pprint(value["generation"])
+import asyncio
+from pprint import pprint
+
+from libs.rag_base.graphs.graph_build import app
+
+
+async def main():
+    # Run
+    inputs = {
+        "question": "What player at the Bears expected to draft first in the 2024 NFL draft?"
+    }
+    async for output in app.astream(inputs):
+        for key, value in output.items():
+            # Node
+            pprint(f"Node '{key}':")
+            # Optional: print full state at each node
+            # pprint.pprint(value["keys"], indent=2, width=80, depth=None)
+        pprint("\n---\n")
+
+    # Final generation
+    pprint(value["generation"])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
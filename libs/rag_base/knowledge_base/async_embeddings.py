@@ -0,0 +1,85 @@
+### Async DashScope embeddings
+
+import asyncio
+import functools
+import itertools
+from typing import List
+
+import httpx
+from langchain_community.embeddings import DashScopeEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from util.dashscope_client import get_async_client
+
+# 相对于共享客户端base_url的接口路径
+DASHSCOPE_EMBEDDING_PATH = "/api/v1/services/embeddings/text-embedding/text-embedding"
+
+# text-embedding-v3/v4单次请求最多10条文本，早期模型为25条
+_MAX_BATCH_SIZE = {"text-embedding-v1": 25, "text-embedding-v2": 25}
+_DEFAULT_MAX_BATCH_SIZE = 10
+
+# 共享的DashScope嵌入模型
+DASHSCOPE_EMBEDDING_MODEL = "text-embedding-v4"
+
+
+class AsyncDashScopeEmbeddings(DashScopeEmbeddings):
+    """异步方法直接调用DashScope REST接口的DashScopeEmbeddings
+
+    同步方法保持父类实现；aembed_query/aembed_documents通过util.dashscope_client共享的HTTP/2连接池发送请求，
+    不再把同步SDK调用放到线程池里执行。
+    """
+
+    async def _aembed_batch(self, client: httpx.AsyncClient, texts: List[str], text_type: str) -> List[List[float]]:
+        response = await client.post(
+            DASHSCOPE_EMBEDDING_PATH,
+            headers={"Authorization": f"Bearer {self.dashscope_api_key}"},
+            json={
+                "model": self.model,
+                "input": {"texts": texts},
+                "parameters": {"text_type": text_type},
+            },
+        )
+        if response.status_code != 200:
+            raise ValueError(f"DashScope embedding request failed ({response.status_code}): {response.text}")
+        embeddings = response.json()["output"]["embeddings"]
+        embeddings.sort(key=lambda item: item["text_index"])
+        return [item["embedding"] for item in embeddings]
+
+    async def _aembed(self, texts: List[str], text_type: str) -> List[List[float]]:
+        client = get_async_client()
+        batch_size = _MAX_BATCH_SIZE.get(self.model, _DEFAULT_MAX_BATCH_SIZE)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results = await asyncio.gather(*[self._aembed_batch(client, b, text_type) for b in batches])
+        return list(itertools.chain.from_iterable(results))
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return await self._aembed(texts, "document")
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self._aembed([text], "query"))[0]
+
+
+@functools.lru_cache(maxsize=1)
+def get_shared_embeddings(dashscope_api_key: str) -> AsyncDashScopeEmbeddings:
+    """进程内共用的text-embedding-v4嵌入模型实例（无状态，可在各repo和默认vectorstore之间共享）"""
+    return AsyncDashScopeEmbeddings(model=DASHSCOPE_EMBEDDING_MODEL, dashscope_api_key=dashscope_api_key)
+
+
+@functools.lru_cache(maxsize=4)
+def _shared_local_embeddings(model_name: str) -> Embeddings:
+    from libs.rag_base.knowledge_base.local_embeddings import LocalFastEmbedEmbeddings
+    return LocalFastEmbedEmbeddings(model_name=model_name)
+
+
+def get_configured_embeddings(config_manager) -> Embeddings:
+    """按配置embedding_backend选择共享的嵌入模型：dashscope（默认）或local（fastembed本地模型，见local_embedding_model）"""
+    backend = config_manager.get_config_value('embedding_backend', 'dashscope')
+    if backend == 'local':
+        from libs.rag_base.knowledge_base.local_embeddings import DEFAULT_LOCAL_EMBEDDING_MODEL
+        return _shared_local_embeddings(
+            config_manager.get_config_value('local_embedding_model', DEFAULT_LOCAL_EMBEDDING_MODEL))
+    if backend != 'dashscope':
+        raise ValueError(f"Unknown embedding_backend: {backend}")
+    return get_shared_embeddings(config_manager.get_dashscope_api_key())
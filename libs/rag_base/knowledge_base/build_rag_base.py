@@ -1,25 +1,219 @@
 ### Build Index
 
+import functools
 import os
-import sys
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from typing import Iterator, List, Dict, Any
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import DashScopeEmbeddings
+from libs.rag_base.knowledge_base.async_embeddings import get_configured_embeddings
 
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
 
-# Initialize config manager (using auto-calculated default path) and get DashScope API key
-config_manager = ConfigManager()
-dashscope_api_key = config_manager.get_dashscope_api_key()
+PR_DATA_SHEET = 'PR Data'
+# 构建文档用到的列，读取Excel时只解析这些列
+PR_DATA_COLUMNS = frozenset({'PR id', 'description', 'general comments', 'review comments',
+                             'issue comments', 'issue id/url', 'code changes', 'PR_rows'})
 
-if not dashscope_api_key:
-    raise ValueError("DashScope API key not found. Please set it in the config file or as an environment variable.")
 
-embd = DashScopeEmbeddings(model="text-embedding-v4", dashscope_api_key=dashscope_api_key)
+def _read_pr_excel(excel_file_path: str) -> pd.DataFrame:
+    """读取Excel中的PR数据，只解析需要的列
+
+    使用openpyxl的只读模式（按行流式读取单元格，不在内存中构建完整的工作簿对象）。
+    """
+    usecols = lambda col: col in PR_DATA_COLUMNS
+    try:
+        return pd.read_excel(excel_file_path, sheet_name=PR_DATA_SHEET, usecols=usecols, engine='openpyxl',
+                             engine_kwargs={'read_only': True, 'data_only': True})
+    except TypeError:
+        # pandas < 2.1的read_excel没有engine_kwargs参数
+        return pd.read_excel(excel_file_path, sheet_name=PR_DATA_SHEET, usecols=usecols, engine='openpyxl')
+
+
+def parquet_path_for(excel_file_path: str) -> str:
+    """Excel数据文件对应的Parquet缓存文件路径"""
+    return os.path.splitext(excel_file_path)[0] + ".parquet"
+
+
+def write_pr_data_parquet(excel_file_path: str) -> str:
+    """把Excel中的PR数据另存为Parquet缓存，之后重建vectorstore时无需再解析xlsx
+    
+    Returns:
+        Parquet文件路径
+    """
+    df = _read_pr_excel(excel_file_path)
+    return _write_parquet(df, parquet_path_for(excel_file_path))
+
+
+def _write_parquet(df: pd.DataFrame, parquet_path: str) -> str:
+    # 文本列可能混有数字，统一为字符串类型以便pyarrow写入（在副本上转换，不影响调用方的df）
+    df = df.copy()
+    object_columns = df.select_dtypes(include="object").columns
+    df[object_columns] = df[object_columns].astype("string")
+    # 先写临时文件再替换，避免并发读取到写了一半的缓存
+    tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, compression="zstd", index=False)
+    os.replace(tmp_path, parquet_path)
+    return parquet_path
+
+
+def _read_pr_dataframe(excel_file_path: str) -> pd.DataFrame:
+    """读取PR数据，Parquet缓存不比Excel旧时优先使用（内存映射读取）
+
+    缓存不存在或已过期时读取Excel，并顺便写出Parquet缓存供下次使用。
+    """
+    parquet_path = parquet_path_for(excel_file_path)
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(excel_file_path):
+        try:
+            return pd.read_parquet(parquet_path, memory_map=True)
+        except Exception as e:
+            print(f"Warning: failed to read {parquet_path}, falling back to Excel: {str(e)}")
+    df = _read_pr_excel(excel_file_path)
+    try:
+        _write_parquet(df, parquet_path)
+    except Exception as e:
+        # 缓存写入失败不影响本次加载
+        print(f"Warning: failed to write Parquet cache {parquet_path}: {str(e)}")
+    return df
+
 
 # 加载Excel文件中的PR数据
+# 文档末尾依次附加的文本列及其标题
+_PR_TEXT_SECTIONS = (
+    ('description', 'Description'),
+    ('general comments', 'General Comments'),
+    ('issue comments', 'Issue Comments'),
+)
+
+
+def _has_text(value) -> bool:
+    """单元格既不是NaN/None也不是空字符串"""
+    return pd.notna(value) and bool(value)
+
+
+def _format_pr_document(pr_id, code_changes, review_block: str, texts: Dict[str, Any]) -> str:
+    """按固定结构拼接PR文档：代码变更、评论、其余文本列（texts为列名到单元格值的映射）"""
+    parts = [f"PR ID: {pr_id}\n"]
+    
+    # 首先添加代码变更，因为这通常是检索的关键
+    if _has_text(code_changes):
+        parts.append(f"\n## CODE CHANGES START ##\n{code_changes}\n## CODE CHANGES END ##\n\n")
+    
+    # 然后添加评论，使用明显的分隔符
+    if review_block:
+        parts.append(review_block)
+    
+    # 最后添加其他信息
+    for column, title in _PR_TEXT_SECTIONS:
+        value = texts.get(column)
+        if _has_text(value):
+            parts.append(f"{title}:\n{value}\n\n")
+    
+    # 所有片段最后一次性拼接，避免反复+=产生中间字符串
+    return ''.join(parts)
+
+
+def _pr_metadata(pr_id, issue_link, excel_file_path: str) -> Dict[str, Any]:
+    metadata = {
+        'pr_id': int(pr_id) if pd.notna(pr_id) else '',  # 转换为基本Python int类型
+        'source': str(excel_file_path)
+    }
+    if _has_text(issue_link):
+        metadata['issue_link'] = str(issue_link)
+    return metadata
+
+
+def iter_excel_pr_data(excel_file_path: str) -> Iterator[Dict[str, Any]]:
+    """逐个产出PR文档（page_content/metadata字典），不在内存中同时保留全部PR文档
+    
+    读取或解析失败时直接抛出异常，避免调用方把不完整的结果当作全部数据。
+    
+    Args:
+        excel_file_path: Excel文件路径
+    """
+    df = _read_pr_dataframe(excel_file_path)
+
+    # 检查必要的列是否存在
+    required_columns = ['PR id', 'description', 'general comments', 'review comments', 
+                       'issue comments', 'issue id/url', 'code changes']
+    for col in required_columns:
+        if col not in df.columns:
+            print(f"Warning: Column '{col}' not found in Excel file.")
+
+    # 处理PR_rows列以识别每个PR的多行数据
+    if 'PR_rows' in df.columns:
+        # 各列只取一次ndarray，之后按位置直接索引，避免每个PR反复做.loc/.iloc查找
+        num_rows = len(df)
+        empty_column = np.full(num_rows, '', dtype=object)
+        columns = {col: df[col].to_numpy() if col in df.columns else empty_column
+                   for col in ('PR id', 'description', 'general comments', 'issue comments',
+                               'issue id/url', 'code changes')}
+        review_column = None
+        if 'review comments' in df.columns:
+            review_series = df['review comments']
+            review_column = review_series.to_numpy()
+            # 整列一次性计算有效评论掩码（字符串且去掉空白后不为空），非字符串单元格经.str得到NaN，按无效处理
+            try:
+                review_valid = review_series.str.strip().str.len().gt(0).to_numpy(dtype=bool, na_value=False)
+            except AttributeError:
+                # 整列没有字符串（例如全部为空，被读成float列）时不能使用.str
+                review_valid = np.zeros(num_rows, dtype=bool)
+        pr_rows_column = df['PR_rows'].to_numpy()
+
+        # 获取每个PR的起始位置
+        pr_starts = np.flatnonzero(pd.notna(pr_rows_column))
+
+        for start in pr_starts:
+            # 确定当前PR的行数
+            try:
+                pr_rows_count = int(pr_rows_column[start])
+            except (ValueError, TypeError):
+                pr_rows_count = 1
+            end = min(start + pr_rows_count, num_rows)
+
+            # 提取当前PR所有行的review comments
+            review_block = ''
+            if review_column is not None:
+                review_comments = review_column[start:end][review_valid[start:end]].tolist()
+                if review_comments:
+                    review_block = ''.join(
+                        ["\n## REVIEW COMMENTS START ##\n"]
+                        + [f"\n--- COMMENT {i} START ---\n{comment}\n--- COMMENT {i} END ---\n"
+                           for i, comment in enumerate(review_comments, 1)]
+                        + ["\n## REVIEW COMMENTS END ##\n"])
+
+            # 构建PR文档内容（PR基本信息取第一行）- 优化文档结构以提高检索效率
+            pr_id = columns['PR id'][start]
+            document_content = _format_pr_document(
+                pr_id, columns['code changes'][start], review_block,
+                {column: columns[column][start] for column, _ in _PR_TEXT_SECTIONS})
+            metadata = _pr_metadata(pr_id, columns['issue id/url'][start], excel_file_path)
+
+            yield {
+                'page_content': document_content,
+                'metadata': metadata
+            }
+    else:
+        # 如果没有PR_rows列，假设每个PR只有一行
+        # itertuples返回普通元组，按列位置取值，避免iterrows为每行构造Series
+        column_positions = {col: pos for pos, col in enumerate(df.columns)}
+        for values in df.itertuples(index=False, name=None):
+            row = {col: values[pos] for col, pos in column_positions.items()}
+            pr_id = row['PR id']
+
+            # 构建PR文档内容 - 优化文档结构以提高检索效率
+            review_comments = row.get('review comments')
+            review_block = (f"\n## REVIEW COMMENTS START ##\n{review_comments}\n## REVIEW COMMENTS END ##\n\n"
+                            if _has_text(review_comments) else '')
+            document_content = _format_pr_document(pr_id, row.get('code changes'), review_block, row)
+            metadata = _pr_metadata(pr_id, row.get('issue id/url'), excel_file_path)
+
+            yield {
+                'page_content': document_content,
+                'metadata': metadata
+            }
+
+
 def load_excel_pr_data(excel_file_path: str) -> List[Dict[str, Any]]:
     """从Excel文件加载PR数据
     
@@ -34,121 +228,7 @@ def load_excel_pr_data(excel_file_path: str) -> List[Dict[str, Any]]:
         return []
     
     try:
-        df = pd.read_excel(excel_file_path, sheet_name='PR Data')
-        
-        # 检查必要的列是否存在
-        required_columns = ['PR id', 'description', 'general comments', 'review comments', 
-                           'issue comments', 'issue id/url', 'code changes']
-        for col in required_columns:
-            if col not in df.columns:
-                print(f"Warning: Column '{col}' not found in Excel file.")
-        
-        # 处理PR数据
-        pr_data_list = []
-        
-        # 处理PR_rows列以识别每个PR的多行数据
-        if 'PR_rows' in df.columns:
-            # 获取每个PR的起始索引
-            pr_start_indices = df[~df['PR_rows'].isna()].index.tolist()
-            
-            for i, start_idx in enumerate(pr_start_indices):
-                # 确定当前PR的行数
-                try:
-                    pr_rows_count = int(df.loc[start_idx, 'PR_rows'])
-                except (ValueError, TypeError):
-                    pr_rows_count = 1
-                
-                # 获取当前PR的所有行
-                end_idx = min(start_idx + pr_rows_count - 1, len(df) - 1)
-                pr_rows = df.iloc[start_idx:end_idx + 1]
-                
-                # 提取PR基本信息（第一行）
-                pr_id = df.loc[start_idx, 'PR id']
-                description = df.loc[start_idx, 'description'] if 'description' in df.columns else ''
-                general_comments = df.loc[start_idx, 'general comments'] if 'general comments' in df.columns else ''
-                issue_comments = df.loc[start_idx, 'issue comments'] if 'issue comments' in df.columns else ''
-                issue_link = df.loc[start_idx, 'issue id/url'] if 'issue id/url' in df.columns else ''
-                code_changes = df.loc[start_idx, 'code changes'] if 'code changes' in df.columns else ''
-                
-                # 提取所有review comments
-                review_comments = []
-                if 'review comments' in df.columns:
-                    for _, row in pr_rows.iterrows():
-                        comment = row['review comments']
-                        if pd.notna(comment) and comment.strip():
-                            review_comments.append(comment)
-                
-                # 构建PR文档内容 - 优化文档结构以提高检索效率
-                document_content = f"PR ID: {pr_id}\n"
-                
-                # 首先添加代码变更，因为这通常是检索的关键
-                if code_changes and pd.notna(code_changes):
-                    document_content += f"\n## CODE CHANGES START ##\n{code_changes}\n## CODE CHANGES END ##\n\n"
-                
-                # 然后添加评论，使用明显的分隔符
-                if review_comments:
-                    document_content += f"\n## REVIEW COMMENTS START ##\n"
-                    for i, comment in enumerate(review_comments, 1):
-                        document_content += f"\n--- COMMENT {i} START ---\n{comment}\n--- COMMENT {i} END ---\n"
-                    document_content += f"\n## REVIEW COMMENTS END ##\n"
-                
-                # 最后添加其他信息
-                if description and pd.notna(description):
-                    document_content += f"Description:\n{description}\n\n"
-                if general_comments and pd.notna(general_comments):
-                    document_content += f"General Comments:\n{general_comments}\n\n"
-                if issue_comments and pd.notna(issue_comments):
-                    document_content += f"Issue Comments:\n{issue_comments}\n\n"
-                
-                # 添加元数据
-                metadata = {
-                    'pr_id': int(pr_id) if pd.notna(pr_id) else '',  # 转换为基本Python int类型
-                    'source': str(excel_file_path)
-                }
-                if 'issue id/url' in row and pd.notna(row['issue id/url']):
-                    metadata['issue_link'] = str(row['issue id/url'])
-                
-                pr_data_list.append({
-                    'page_content': document_content,
-                    'metadata': metadata
-                })
-        else:
-            # 如果没有PR_rows列，假设每个PR只有一行
-            for _, row in df.iterrows():
-                pr_id = row['PR id']
-                
-                # 构建PR文档内容 - 优化文档结构以提高检索效率
-                document_content = f"PR ID: {pr_id}\n"
-                
-                # 首先添加代码变更，因为这通常是检索的关键
-                if 'code changes' in row and pd.notna(row['code changes']):
-                    document_content += f"\n## CODE CHANGES START ##\n{row['code changes']}\n## CODE CHANGES END ##\n\n"
-                
-                # 然后添加评论，使用明显的分隔符
-                if 'review comments' in row and pd.notna(row['review comments']):
-                    document_content += f"\n## REVIEW COMMENTS START ##\n{row['review comments']}\n## REVIEW COMMENTS END ##\n\n"
-                
-                # 最后添加其他信息
-                if 'description' in row and pd.notna(row['description']):
-                    document_content += f"Description:\n{row['description']}\n\n"
-                if 'general comments' in row and pd.notna(row['general comments']):
-                    document_content += f"General Comments:\n{row['general comments']}\n\n"
-                if 'issue comments' in row and pd.notna(row['issue comments']):
-                    document_content += f"Issue Comments:\n{row['issue comments']}\n\n"
-                
-                # 添加元数据
-                metadata = {
-                    'pr_id': int(pr_id) if pd.notna(pr_id) else '',  # 转换为基本Python int类型
-                    'source': str(excel_file_path)
-                }
-                if 'issue id/url' in row and pd.notna(row['issue id/url']):
-                    metadata['issue_link'] = str(row['issue id/url'])
-                
-                pr_data_list.append({
-                    'page_content': document_content,
-                    'metadata': metadata
-                })
-        
+        pr_data_list = list(iter_excel_pr_data(excel_file_path))
         print(f"Successfully loaded {len(pr_data_list)} PRs from {excel_file_path}")
         return pr_data_list
         
@@ -159,23 +239,25 @@ def load_excel_pr_data(excel_file_path: str) -> List[Dict[str, Any]]:
 # 创建默认的向量存储和检索器
 # 注意：在实际使用中，每个仓库会有自己独立的向量存储
 # 这个默认检索器主要用于确保系统可以正常启动
-
-# 获取配置的PR审查数据目录路径
-pr_review_data_dir = config_manager.get_pr_review_data_dir()
-
-# 创建一个默认的持久化目录用于Chroma向量存储
-persist_directory = os.path.join(pr_review_data_dir, "chroma_db")
-
-# 确保持久化目录存在
-if not os.path.exists(persist_directory):
+# 默认向量存储在第一次检索时才创建，导入本模块（例如只需要load_excel_pr_data）时不读取API密钥、不创建Chroma
+@functools.lru_cache(maxsize=1)
+def get_default_vectorstore() -> Chroma:
+    """获取默认的Chroma向量存储（首次调用时创建）"""
+    config_manager = get_default_config_manager()
+    dashscope_api_key = config_manager.get_dashscope_api_key()
+    if not dashscope_api_key:
+        raise ValueError("DashScope API key not found. Please set it in the config file or as an environment variable.")
+    
+    # 创建一个默认的持久化目录用于Chroma向量存储
+    persist_directory = os.path.join(config_manager.get_pr_review_data_dir(), "chroma_db")
     os.makedirs(persist_directory, exist_ok=True)
     
-# 创建一个空的Chroma向量存储
-vectorstore = Chroma(
-    persist_directory=persist_directory,
-    embedding_function=embd,
-    collection_name="rag-chroma-default"
-)
+    # 创建一个空的Chroma向量存储，与各repo的vectorstore共用同一个嵌入模型实例
+    return Chroma(
+        persist_directory=persist_directory,
+        embedding_function=get_configured_embeddings(config_manager),
+        collection_name="rag-chroma-default"
+    )
 
 # 创建检索器
 def retriever_wrapper(query, custom_vectorstore=None):
@@ -190,7 +272,7 @@ def retriever_wrapper(query, custom_vectorstore=None):
     """
     try:
         # 优先使用传入的custom_vectorstore，如果没有则使用默认的vectorstore
-        store_to_use = custom_vectorstore if custom_vectorstore is not None else vectorstore
+        store_to_use = custom_vectorstore if custom_vectorstore is not None else get_default_vectorstore()
         # 尝试从向量存储中检索文档
         return store_to_use.similarity_search(query, k=4)
     except Exception as e:
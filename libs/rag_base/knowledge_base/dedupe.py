@@ -0,0 +1,87 @@
+### Document de-duplication
+
+import hashlib
+from typing import Dict, List, Set
+
+import numpy as np
+from langchain.schema import Document
+
+# 近似重复判定：词级4-shingle集合的Jaccard相似度阈值
+NEAR_DUP_JACCARD = 0.9
+SHINGLE_SIZE = 4
+# 嵌入前的SimHash去重：64位指纹汉明距离小于该值视为近似重复
+SIMHASH_MAX_DISTANCE = 3
+_SIMHASH_BITS = 64
+
+
+def _content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+def _stable_hash(text: str) -> int:
+    """64位无符号哈希；内置hash()按进程随机加盐，切分在新启动的进程池进程中执行，必须跨进程稳定"""
+    return int.from_bytes(_content_hash(text), "little")
+
+
+def _shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """词级shingle的哈希集合，文本不足size个词时整体作为一个shingle"""
+    words = text.split()
+    if len(words) <= size:
+        return {_stable_hash(" ".join(words))}
+    return {_stable_hash(" ".join(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def _jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def dedupe_documents(documents: List[Document], threshold: float = NEAR_DUP_JACCARD) -> List[Document]:
+    """去掉完全重复和近似重复的文档，保留先出现的（检索排序更靠前的）文档"""
+    seen_hashes = set()
+    kept: List[Document] = []
+    kept_shingles: List[Set[int]] = []
+    for doc in documents:
+        digest = _content_hash(doc.page_content)
+        if digest in seen_hashes:
+            continue
+        seen_hashes.add(digest)
+        shingles = _shingles(doc.page_content)
+        if any(_jaccard(shingles, other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+    return kept
+
+
+def simhash(text: str) -> int:
+    """文本的64位SimHash指纹：对每个shingle哈希的各位按多数表决"""
+    features = np.fromiter(_shingles(text), dtype=np.uint64)
+    bits = np.unpackbits(features.view(np.uint8)).reshape(-1, _SIMHASH_BITS)
+    votes = bits.sum(axis=0) * 2 > len(features)
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
+
+
+def simhash_keep_indices(texts: List[str], max_distance: int = SIMHASH_MAX_DISTANCE) -> List[int]:
+    """按SimHash去掉近似重复的文本，返回保留文本的下标（重复时保留先出现的）
+
+    指纹切成max_distance段：汉明距离小于max_distance的两个指纹至少有一段完全相同，
+    只需与同段相同的已保留指纹逐个比较。
+    """
+    bands = max(max_distance, 1)
+    width = _SIMHASH_BITS // bands
+    shifts = [i * width for i in range(bands)]
+    masks = [(1 << (width if i < bands - 1 else _SIMHASH_BITS - shifts[i])) - 1 for i in range(bands)]
+    buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+    kept = []
+    for idx, text in enumerate(texts):
+        fingerprint = simhash(text)
+        keys = [(fingerprint >> shift) & mask for shift, mask in zip(shifts, masks)]
+        if any(bin(fingerprint ^ other).count("1") < max_distance
+               for band, key in zip(buckets, keys) for other in band.get(key, ())):
+            continue
+        kept.append(idx)
+        for band, key in zip(buckets, keys):
+            band.setdefault(key, []).append(fingerprint)
+    return kept
@@ -0,0 +1,38 @@
+### Local ONNX embeddings
+
+import asyncio
+import os
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_LOCAL_EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+
+
+class LocalFastEmbedEmbeddings(Embeddings):
+    """用fastembed在本地CPU上计算向量（onnxruntime执行量化ONNX模型），不发送DashScope网络请求
+
+    fastembed是可选依赖，只有配置embedding_backend为local时才需要安装。
+    """
+
+    def __init__(self, model_name: str = DEFAULT_LOCAL_EMBEDDING_MODEL, threads: Optional[int] = None):
+        try:
+            from fastembed import TextEmbedding
+        except ImportError as e:
+            raise ImportError("embedding_backend为local时需要安装fastembed: pip install fastembed") from e
+        # 与DashScopeEmbeddings一致，用model属性标识向量来自哪个模型
+        self.model = model_name
+        self._model = TextEmbedding(model_name=model_name, threads=threads or os.cpu_count())
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [vector.tolist() for vector in self._model.embed(texts)]
+
+    def embed_query(self, text: str) -> List[float]:
+        return next(iter(self._model.query_embed(text))).tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # ONNX推理会释放GIL，放到线程中执行，不阻塞事件循环
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
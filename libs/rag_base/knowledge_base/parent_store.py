@@ -0,0 +1,65 @@
+### Parent chunk store for small-to-big retrieval
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+from langchain.schema import Document
+
+# 子块metadata中指向父块的键
+PARENT_ID_KEY = "parent_id"
+# 父块映射在持久化目录中的文件名
+PARENT_STORE_FILENAME = "parents.json"
+
+
+class ParentStore:
+    """parent_id -> 父块文本的映射
+
+    向量库只保存较小的子块（召回更精确），检索命中子块后用本映射换回所属的父块，
+    交给LLM的上下文仍是完整的大块。映射以JSON文件保存在vectorstore的持久化目录中。
+    """
+
+    def __init__(self, parents: Optional[Dict[str, str]] = None):
+        self._parents: Dict[str, str] = parents or {}
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ParentStore"]:
+        """从JSON文件加载，文件不存在时返回None"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def save(self, path: str):
+        """先写临时文件再替换，避免读到写了一半的映射"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._parents, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def add(self, text: str) -> str:
+        """登记一个父块，返回其parent_id（由内容决定，重建时内容不变的父块ID也不变）"""
+        parent_id = hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+        self._parents[parent_id] = text
+        return parent_id
+
+    def expand(self, documents: List[Document]) -> List[Document]:
+        """把子块替换为父块，同一父块只保留排序最靠前的一次；没有parent_id的文档原样保留"""
+        expanded = []
+        seen = set()
+        for doc in documents:
+            parent_id = doc.metadata.get(PARENT_ID_KEY)
+            parent = self._parents.get(parent_id) if parent_id else None
+            if parent is None:
+                expanded.append(doc)
+                continue
+            if parent_id in seen:
+                continue
+            seen.add(parent_id)
+            expanded.append(Document(page_content=parent, metadata=dict(doc.metadata)))
+        return expanded
+
+    def __len__(self):
+        return len(self._parents)
@@ -0,0 +1,99 @@
+### Fast text splitter
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import List, Optional
+
+from langchain.schema import Document
+
+# 一次扫描找出所有候选切分点，分组名表示切分点的优先级（段落 > 行 > 句子 > 单词）
+_SPLIT_RE = re.compile(r"(?P<para>\n\n)|(?P<line>\n)|(?P<sentence>(?<=[.?!]) )|(?P<word> )")
+_SEPARATOR_PRIORITY = ("para", "line", "sentence", "word")
+
+
+class RegexTextSplitter:
+    """不递归的文本分割器
+
+    与RecursiveCharacterTextSplitter的分隔符优先级一致：每个窗口内优先在段落边界切分，
+    其次是换行、句末和空格，都没有时按chunk_size硬切。切分点由预编译正则一次扫描得到，
+    再用二分查找贪心打包，避免对长diff反复递归split。
+
+    切分后再做一次合并：短于min_chunk_size的末尾块并入前一块（合并后不超过max_chunk_size），
+    避免每个文档末尾产生只有几十个字符、缺少上下文的碎块。
+    """
+
+    def __init__(self, chunk_size: int = 2000, chunk_overlap: int = 300,
+                 min_chunk_size: Optional[int] = None, max_chunk_size: Optional[int] = None):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        # 默认最小块为chunk_size的1/5，合并后允许超出chunk_size 15%
+        self.min_chunk_size = chunk_size // 5 if min_chunk_size is None else min_chunk_size
+        self.max_chunk_size = chunk_size * 115 // 100 if max_chunk_size is None else max_chunk_size
+        if self.max_chunk_size < chunk_size:
+            raise ValueError(f"max_chunk_size ({self.max_chunk_size}) must not be smaller than chunk_size ({chunk_size})")
+
+    @staticmethod
+    def _breakpoints(text: str):
+        """返回每类分隔符的切分位置（分隔符结束处），以及所有切分位置的有序列表"""
+        by_kind = {kind: [] for kind in _SEPARATOR_PRIORITY}
+        for match in _SPLIT_RE.finditer(text):
+            by_kind[match.lastgroup].append(match.end())
+        all_points = sorted(p for points in by_kind.values() for p in points)
+        return by_kind, all_points
+
+    def split_text(self, text: str) -> List[str]:
+        size = self.chunk_size
+        if len(text) <= size:
+            stripped = text.strip()
+            return [stripped] if stripped else []
+
+        by_kind, all_points = self._breakpoints(text)
+        chunks = []
+        prev_start = None
+        start = 0
+        length = len(text)
+        while start < length:
+            limit = start + size
+            if limit >= length:
+                end = length
+            else:
+                end = None
+                # 只接受落在窗口后半段的高优先级切分点，避免产生过小的块
+                lower = start + size // 2
+                for kind in _SEPARATOR_PRIORITY:
+                    points = by_kind[kind]
+                    idx = bisect_right(points, limit) - 1
+                    if idx >= 0 and points[idx] > lower:
+                        end = points[idx]
+                        break
+                if end is None:
+                    idx = bisect_right(all_points, limit) - 1
+                    end = all_points[idx] if idx >= 0 and all_points[idx] > start else limit
+
+            chunk = text[start:end].strip()
+            if chunk:
+                # 末尾碎块并入前一块：前一块与末尾块有重叠，直接取前一块起点到文本结尾
+                if (end >= length and chunks and len(chunk) < self.min_chunk_size
+                        and length - prev_start <= self.max_chunk_size):
+                    chunks[-1] = text[prev_start:].strip()
+                else:
+                    chunks.append(chunk)
+                    prev_start = start
+            if end >= length:
+                break
+
+            # 下一块从重叠区域内的第一个切分点开始，保证不从单词中间开始
+            overlap_start = max(end - self.chunk_overlap, start + 1)
+            idx = bisect_left(all_points, overlap_start)
+            start = all_points[idx] if idx < len(all_points) and all_points[idx] < end else overlap_start
+        return chunks
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        """分割文档，每个分块复制原文档的metadata"""
+        return [
+            Document(page_content=chunk, metadata=dict(doc.metadata))
+            for doc in documents
+            for chunk in self.split_text(doc.page_content)
+        ]
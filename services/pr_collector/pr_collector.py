@@ -1,48 +1,71 @@
+import asyncio
 import os
-import hashlib
 from libs.pr_helper.export_all_prs_to_excel import GitHubAllPRsExporter
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
 from services.repo_manager.repo_manager import repo_service_manager
+from libs.rag_base.knowledge_base.build_rag_base import write_pr_data_parquet
+
+def _stat_key(path: str):
+    """文件变化判断键：(大小, 纳秒级修改时间)，文件不存在时返回None"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+def _export_merged_prs(owner: str, repo: str) -> bool:
+    """导出指定仓库的所有merged PR到excel，返回文件是否发生变化（变化时同时生成Parquet缓存）"""
+    # 初始化配置管理器（使用自动计算的默认路径）
+    config_manager = get_default_config_manager()
+    token = config_manager.get_github_token()
+    refresh = config_manager.get_config_value('auto_update_pr_data', False)
+    
+    # 使用配置管理器获取PR审查数据目录路径
+    data_dir = config_manager.get_pr_review_data_dir()
+    output_dir = os.path.join(data_dir, owner, repo)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # 初始化PR导出器
+    exporter = GitHubAllPRsExporter(token, refresh)
+    
+    # 导出所有merged PR到excel
+    output_file = f"{output_dir}/all_merged_prs.xlsx"
+    
+    # 记录导出前文件的大小和修改时间（无需读取文件内容）
+    pre_key = _stat_key(output_file)
+    
+    # 执行导出操作
+    exporter.export_all_prs_to_excel(owner, repo, output_file, state="merged")
+    
+    # 检查导出后文件是否变化；内容相同但被重写时，构建vectorstore会按内容摘要跳过重新嵌入
+    file_changed = pre_key is None or _stat_key(output_file) != pre_key
+    
+    if file_changed:
+        # 先生成Parquet缓存，构建vectorstore时直接读取，不再解析xlsx
+        try:
+            write_pr_data_parquet(output_file)
+        except Exception as e:
+            print(f"生成Parquet缓存失败，将直接读取Excel: {str(e)}")
+    return file_changed
 
 def collect_merged_prs_task(owner: str, repo: str):
-    """异步任务：收集指定仓库的所有merged PR并生成excel文件"""
+    """同步任务：收集指定仓库的所有merged PR并生成excel文件"""
     try:
-        # 初始化配置管理器（使用自动计算的默认路径）
-        config_manager = ConfigManager()
-        token = config_manager.get_github_token()
-        refresh = config_manager.get_config_value('auto_update_pr_data', False)
-        
-        # 使用配置管理器获取PR审查数据目录路径
-        data_dir = config_manager.get_pr_review_data_dir()
-        output_dir = os.path.join(data_dir, owner, repo)
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # 初始化PR导出器
-        exporter = GitHubAllPRsExporter(token, refresh)
-        
-        # 导出所有merged PR到excel
-        output_file = f"{output_dir}/all_merged_prs.xlsx"
-        
-        # 检查导出前文件是否存在及哈希值
-        file_changed = True
-        if os.path.exists(output_file):
-            # 计算导出前文件的哈希值
-            with open(output_file, 'rb') as f:
-                pre_hash = hashlib.md5(f.read()).hexdigest()
-        else:
-            pre_hash = None
-        
-        # 执行导出操作
-        exporter.export_all_prs_to_excel(owner, repo, output_file, state="merged")
-        
-        # 检查导出后文件是否变化
-        if pre_hash is not None:
-            with open(output_file, 'rb') as f:
-                post_hash = hashlib.md5(f.read()).hexdigest()
-            file_changed = pre_hash != post_hash
-        
         # 只有当Excel文件发生变化时，才更新vectorstore
-        if file_changed:
+        if _export_merged_prs(owner, repo):
             repo_service_manager.update_service_vectorstore(owner, repo)
     except Exception as e:
-        print(f"收集PR时出错: {str(e)}")
\ No newline at end of file
+        print(f"收集PR时出错: {str(e)}")
+
+async def acollect_merged_prs_task(owner: str, repo: str, executor=None):
+    """异步任务：导出和vectorstore构建分别提交到线程池执行，不阻塞事件循环
+
+    Args:
+        executor: 执行导出和构建的线程池，为None时使用事件循环默认线程池
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(executor, _export_merged_prs, owner, repo):
+            await repo_service_manager.aupdate_service_vectorstore(owner, repo, executor)
+    except Exception as e:
+        print(f"收集PR时出错: {str(e)}")
@@ -1,10 +1,64 @@
 from abc import ABC, abstractmethod
 import os
+import re
+import asyncio
+import logging
 from abc import ABC, abstractmethod
 from typing import Optional
 from fastapi import HTTPException
 from services.repo_manager.repo_manager import repo_service_manager
 from libs.rag.langgraph_wrapper import LangGraphWrapper
+from libs.rag.answer_cache import evidence_ids
+from libs.rag_base.graphs.graph_defs import aget_pr_details
+
+logger = logging.getLogger(__name__)
+
+# 语义缓存校验证据时检索的文档数量
+CACHE_EVIDENCE_K = 5
+
+# 涉及具体PR的查询（与router_question_llm的_PR_URL_RE/_PR_NUM_RE相同，带捕获组）
+_PR_URL_RE = re.compile(r"github\.com/([\w.-]+)/([\w.-]+)/pull/(\d+)", re.I)
+_PR_NUM_RE = re.compile(r"\b(?:PR|pull\s*request)\s*#?\s*(\d+)", re.I)
+# 去掉链接的协议和www前缀后与_PR_URL_RE的匹配文本比较，判断查询是否只是一个PR链接
+_BARE_URL_PREFIX_RE = re.compile(r"^(?:https?://)?(?:www\.)?", re.I)
+
+
+async def _answer_cache_key(owner: str, repo: str, query: str) -> Optional[str]:
+    """答案缓存的精确匹配键
+    
+    普通问题直接用查询文本；涉及具体PR的查询改用PR编号和当前head SHA，PR有新提交后自然失效
+    （单独的PR链接只用PR和head SHA，带PR编号的自由提问再加上问题文本）。
+    取不到head SHA时返回None，本次不使用缓存。
+    """
+    url_match = _PR_URL_RE.search(query)
+    if url_match:
+        pr_owner, pr_repo, pr_number = url_match.groups()
+    else:
+        num_match = _PR_NUM_RE.search(query)
+        if not num_match:
+            return query
+        pr_owner, pr_repo, pr_number = owner, repo, num_match.group(1)
+    
+    try:
+        # get_pr_node随后读取同一个PR的详情时直接命中短期缓存，不会再请求一次GitHub API
+        pr_details = await aget_pr_details(pr_owner, pr_repo, int(pr_number))
+        head_sha = pr_details["head"]["sha"]
+    except Exception as e:
+        logger.warning(f"获取PR head SHA失败，跳过答案缓存: {str(e)}")
+        return None
+    
+    key = f"pr\x00{pr_owner}/{pr_repo}#{pr_number}\x00{head_sha}".lower()
+    if not (url_match and _BARE_URL_PREFIX_RE.sub("", query.strip().rstrip("/")) == url_match.group(0)):
+        key = f"{key}\x00{query}"
+    return key
+
+def _get_langgraph_wrapper(service: dict) -> LangGraphWrapper:
+    """复用service中缓存的LangGraphWrapper，vectorstore重新加载或重建后才重新创建"""
+    wrapper = service.get("langgraph_wrapper")
+    if wrapper is None or wrapper.vectorstore is not service["vectorstore"]:
+        wrapper = LangGraphWrapper(service["vectorstore"], service.get("parent_store"))
+        service["langgraph_wrapper"] = wrapper
+    return wrapper
 
 class RAGService(ABC):
     """RAG服务的抽象基类"""
@@ -27,15 +81,57 @@ class DefaultRAGService(RAGService):
         if not service["initialized"] or not service["vectorstore"]:
             raise ValueError("服务尚未初始化，请先构建vectorstore")
         
+        answer_cache = service.get("answer_cache")
+        if answer_cache is None:
+            langgraph_wrapper = _get_langgraph_wrapper(service)
+            return await langgraph_wrapper.query(query)
+        
+        # 1. 精确匹配缓存
+        cache_key = await _answer_cache_key(owner, repo, query)
+        if cache_key is None:
+            langgraph_wrapper = _get_langgraph_wrapper(service)
+            return await langgraph_wrapper.query(query)
+        cached = answer_cache.get_exact(cache_key)
+        if cached is not None:
+            logger.info(f"答案缓存精确命中: {owner}/{repo}")
+            return cached
+        
+        # 2. 语义缓存：需要查询向量和当前检索证据。
+        # 涉及具体PR的查询（缓存键不是查询文本本身）不走语义匹配：只差一位PR编号的链接向量几乎相同，
+        # 按同一向量检索到的证据也相同，会把别的PR的审查结果当成命中
+        query_embedding = None
+        current_evidence = frozenset()
+        if cache_key == query:
+            try:
+                query_embedding = await service["embedding_model"].aembed_query(query)
+                docs = await asyncio.to_thread(
+                    service["vectorstore"].similarity_search_by_vector, query_embedding, k=CACHE_EVIDENCE_K
+                )
+                current_evidence = evidence_ids(docs)
+                cached = answer_cache.get_semantic(query_embedding, current_evidence)
+                if cached is not None:
+                    logger.info(f"答案缓存语义命中: {owner}/{repo}")
+                    return cached
+            except Exception as e:
+                # 缓存失败不影响正常查询
+                logger.warning(f"答案缓存查询失败: {str(e)}")
+                query_embedding = None
+        
         # 使用LangGraph回答问题
-        langgraph_wrapper = LangGraphWrapper(service["vectorstore"])
-        return await langgraph_wrapper.query(query)
+        langgraph_wrapper = _get_langgraph_wrapper(service)
+        answer, final_node = await langgraph_wrapper.query_with_trace(query, query_embedding)
+        
+        # 只缓存通过幻觉检测的RAG答案（no_hallucination路径）
+        if final_node == "generate_node":
+            # PR查询不写入向量，不参与之后的语义匹配
+            answer_cache.put(cache_key, query_embedding if cache_key == query else None, current_evidence, answer)
+        return answer
 
 # 默认的RAG服务实例
 default_rag_service = DefaultRAGService()
 
-async def review_pr(owner: str, repo: str, pr_id: str = None, question: str = None):
-    """PR review服务接口的实现"""
+async def _prepare_review(owner: str, repo: str, pr_id: str = None, question: str = None) -> str:
+    """校验参数并确保服务可用，返回要执行的查询"""
     if not owner or not repo:
         raise HTTPException(status_code=400, detail="Owner and repo parameters are required")
     
@@ -44,8 +140,8 @@ async def review_pr(owner: str, repo: str, pr_id: str = None, question: str = No
     
     # 检查服务是否已初始化
     if not service["initialized"] or not service["vectorstore"]:
-        # 如果服务未初始化，尝试从Excel文件构建vectorstore
-        repo_service_manager.update_service_vectorstore(owner, repo)
+        # 如果服务未初始化，尝试从Excel文件构建vectorstore（放到工作线程，避免阻塞事件循环）
+        await repo_service_manager.aupdate_service_vectorstore(owner, repo)
         service = repo_service_manager.get_service(owner, repo)
         
         if not service["initialized"]:
@@ -59,12 +155,16 @@ async def review_pr(owner: str, repo: str, pr_id: str = None, question: str = No
     if pr_id:
         # 如果指定了PR ID，构建关于该PR的问题
         #query = f"请审查PR {pr_id}，并给出评论"
-        query = pr_id
+        return pr_id
     elif question:
         # 如果提供了自定义问题，使用该问题
-        query = question
+        return question
     else:
         raise HTTPException(status_code=400, detail="Either pr_id or question parameter is required")
+
+async def review_pr(owner: str, repo: str, pr_id: str = None, question: str = None):
+    """PR review服务接口的实现"""
+    query = await _prepare_review(owner, repo, pr_id, question)
     
     try:
         # 使用RAG服务回答问题
@@ -73,4 +173,25 @@ async def review_pr(owner: str, repo: str, pr_id: str = None, question: str = No
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"处理请求时出错: {str(e)}")
 
-import os
\ No newline at end of file
+async def review_pr_stream(owner: str, repo: str, pr_id: str = None, question: str = None):
+    """流式PR review：校验通过后返回一个异步生成器，逐个产出事件字典"""
+    query = await _prepare_review(owner, repo, pr_id, question)
+    service = repo_service_manager.get_service(owner, repo)
+    answer_cache = service.get("answer_cache")
+    
+    async def _events():
+        cache_key = await _answer_cache_key(owner, repo, query) if answer_cache is not None else None
+        # 精确缓存命中时直接返回最终结果
+        cached = answer_cache.get_exact(cache_key) if cache_key is not None else None
+        if cached is not None:
+            yield {"type": "final", "node": "cache", "text": cached}
+            return
+        
+        langgraph_wrapper = _get_langgraph_wrapper(service)
+        async for event in langgraph_wrapper.astream_query(query):
+            if event["type"] == "final" and event["node"] == "generate_node" and cache_key is not None:
+                # 流式路径没有计算查询向量，只写入精确匹配缓存
+                answer_cache.put(cache_key, None, frozenset(), event["text"])
+            yield event
+    
+    return _events()
@@ -1,48 +1,348 @@
 import os
+import json
+import hashlib
+import functools
+import asyncio
 import logging
-from typing import Dict
-from util.config_manager import ConfigManager
-from langchain_community.embeddings import DashScopeEmbeddings
-from libs.rag_base.knowledge_base.build_rag_base import load_excel_pr_data
-from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import itertools
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple
+from util.config_manager import ConfigManager, get_default_config_manager
+from util import dashscope_client
+from libs.rag_base.knowledge_base.async_embeddings import get_configured_embeddings, DASHSCOPE_EMBEDDING_MODEL
+from libs.rag_base.knowledge_base.build_rag_base import iter_excel_pr_data
+from libs.rag.answer_cache import SemanticCache
+from libs.rag_base.knowledge_base.text_splitter import RegexTextSplitter
+from libs.rag_base.knowledge_base.dedupe import simhash_keep_indices
+from libs.rag_base.knowledge_base.parent_store import ParentStore, PARENT_ID_KEY, PARENT_STORE_FILENAME
+import chromadb
+import numpy as np
 from langchain_community.vectorstores import Chroma
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 分割文档 - 增大块大小以确保评论部分不会被分割出去；分割器无状态，所有repo共用一个实例
+_TEXT_SPLITTER = RegexTextSplitter(chunk_size=2000, chunk_overlap=300)
+# 父块再切成较小的子块用于嵌入和检索，命中后换回父块交给LLM
+_CHILD_SPLITTER = RegexTextSplitter(chunk_size=400, chunk_overlap=50)
+
+# 构建vectorstore时每次嵌入请求包含的文本数
+EMBED_BATCH_SIZE = 64
+# 同时进行中的嵌入批次数上限，避免大仓库一次性发出上千个请求触发DashScope限流
+EMBED_MAX_CONCURRENCY = 8
+
+
+async def _aembed_all(embd, texts, batch=EMBED_BATCH_SIZE, max_concurrency=EMBED_MAX_CONCURRENCY):
+    """按批次并发嵌入所有文本（最多max_concurrency个批次同时进行），返回与texts顺序一致的向量列表"""
+    chunks = [texts[i:i + batch] for i in range(0, len(texts), batch)]
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def embed_chunk(chunk):
+        async with semaphore:
+            return await embd.aembed_documents(chunk)
+
+    results = await asyncio.gather(*[embed_chunk(c) for c in chunks])
+    return list(itertools.chain.from_iterable(results))
+
+
+async def _aembed_all_in_own_loop(embd, texts):
+    """在asyncio.run新建的事件循环中嵌入全部文本，结束时关闭该循环的DashScope连接池
+
+    每次构建都会新建事件循环，dashscope_client为该循环创建的连接池不会被服务关闭时的清理覆盖。
+    """
+    try:
+        return await _aembed_all(embd, texts)
+    finally:
+        await dashscope_client.aclose()
+
+
+# 记录在Chroma集合元数据中的Excel内容摘要键，内容未变化时跳过重建
+EXCEL_DIGEST_KEY = "excel_digest"
+# 记录在Chroma集合元数据中的Excel(大小:修改时间)签名键，签名一致时连摘要都不用计算
+EXCEL_STAT_KEY = "excel_stat"
+# 记录在Chroma集合元数据中的嵌入模型名，切换embedding_backend后向量维度不同，必须整体重建
+EMBEDDING_MODEL_KEY = "embedding_model"
+
+
+def _collection_embedding_model(metadata: Dict) -> str:
+    # 增加该键之前构建的集合都使用DashScope模型
+    return metadata.get(EMBEDDING_MODEL_KEY, DASHSCOPE_EMBEDDING_MODEL)
+
+
+def _stat_signature(path: str, st: os.stat_result = None) -> str:
+    """(大小:修改时间)签名，调用方已有stat结果时直接传入，不再重复stat"""
+    st = st or os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """分块流式计算文件的blake2b摘要，不一次性读入整个文件"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=256)
+def _file_digest_for_stat(path: str, size: int, mtime_ns: int) -> str:
+    return _file_digest(path)
+
+
+def _excel_digest(path: str) -> str:
+    """Excel文件摘要，按(路径, 大小, 修改时间)缓存：文件未被重写时（例如LRU淘汰后重新加载）不再重复读取整个文件计算哈希"""
+    st = os.stat(path)
+    return _file_digest_for_stat(path, st.st_size, st.st_mtime_ns)
+
+
+# 无法从chromadb客户端获取单批写入上限时使用的保守值
+CHROMA_FALLBACK_MAX_BATCH = 5000
+
+
+def _chroma_max_batch(vectorstore) -> int:
+    """chromadb单次add允许的最大记录数（由底层SQLite变量数限制决定）"""
+    try:
+        return int(vectorstore._client.get_max_batch_size())
+    except Exception:
+        return CHROMA_FALLBACK_MAX_BATCH
+
+
+def _flatten_metadata(metadata: Dict) -> Dict:
+    """把metadata转换为chromadb直接支持的基本类型：numpy标量取.item()，日期转ISO字符串，丢弃None，其余非基本类型转为字符串"""
+    flat = {}
+    for key, value in metadata.items():
+        if value is None:
+            continue
+        if isinstance(value, np.generic):
+            value = value.item()
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()
+        if not isinstance(value, (str, int, float, bool)):
+            value = str(value)
+        flat[key] = value
+    return flat
+
+
+def _text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _as_list(vector) -> List[float]:
+    # chromadb返回的向量是numpy数组，与新嵌入的列表统一为列表再写入
+    return vector.tolist() if hasattr(vector, "tolist") else vector
+
+
+def _chunk_id(text: str, metadata: Dict) -> str:
+    """由内容和metadata得到的稳定分块ID：未变化的分块在重建时ID不变，可跳过重新嵌入"""
+    key = json.dumps(metadata, sort_keys=True, ensure_ascii=False) + "\x00" + text
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _split_pr_documents(excel_file_path: str):
+    """读取PR数据并切分为父块/子块（纯CPU工作，可在子进程中执行）
+
+    Returns:
+        (parent_store, 子块ID列表, 子块文本列表, 子块metadata列表)，没有PR数据时返回None
+    """
+    # 分割文档：父块登记到parent_store，只有带parent_id的子块写入向量库。
+    # 直接对字符串调用split_text，不为每个父块/子块构造Document；同一父块的子块共用一个metadata字典
+    parent_store = ParentStore()
+    texts = []
+    metadatas = []
+    # 逐个消费PR文档，全部PR文档不会同时驻留内存；读取失败时异常向上抛出，不会用不完整的数据更新集合
+    for doc in iter_excel_pr_data(excel_file_path):
+        for parent in _TEXT_SPLITTER.split_text(doc['page_content']):
+            # 每个父块只转换一次，其子块共用结果
+            metadata = _flatten_metadata({**doc['metadata'], PARENT_ID_KEY: parent_store.add(parent)})
+            for child in _CHILD_SPLITTER.split_text(parent):
+                texts.append(child)
+                metadatas.append(metadata)
+    
+    if not texts:
+        return None
+    
+    # 跳过近似重复的子块（模板化的描述、相同的评论等），减少嵌入请求和索引大小
+    kept = simhash_keep_indices(texts)
+    if len(kept) < len(texts):
+        logger.info(f"SimHash去重跳过 {len(texts) - len(kept)}/{len(texts)} 个近似重复分块")
+        texts = [texts[i] for i in kept]
+        metadatas = [metadatas[i] for i in kept]
+    ids = [_chunk_id(text, metadata) for text, metadata in zip(texts, metadatas)]
+    return parent_store, ids, texts, metadatas
+
+
+# 解析和切分PR数据的进程池大小：多个repo同时重建时，这部分Python计算不再争用同一个GIL
+SPLIT_PROCESS_WORKERS = 4
+_split_pool = None
+_split_pool_lock = threading.Lock()
+
+
+def _get_split_pool() -> ProcessPoolExecutor:
+    global _split_pool
+    with _split_pool_lock:
+        if _split_pool is None:
+            # 使用spawn启动子进程：服务进程已有事件循环、线程池和chromadb客户端，
+            # fork会把这些线程持有的锁状态一并复制到子进程中
+            _split_pool = ProcessPoolExecutor(max_workers=SPLIT_PROCESS_WORKERS,
+                                              mp_context=multiprocessing.get_context("spawn"))
+        return _split_pool
+
+
+def _split_pr_documents_in_pool(excel_file_path: str):
+    """在进程池中执行_split_pr_documents，进程池不可用时退回当前线程执行"""
+    global _split_pool
+    try:
+        return _get_split_pool().submit(_split_pr_documents, excel_file_path).result()
+    except BrokenProcessPool as e:
+        logger.warning(f"切分进程池不可用，改为在当前线程切分: {str(e)}")
+        with _split_pool_lock:
+            _split_pool = None
+        return _split_pr_documents(excel_file_path)
+
+
+def _prewarm_vectorstore(vectorstore, name: str):
+    """用集合中已有的一个向量执行一次检索，让chromadb把HNSW索引载入内存，避免第一个真实查询承担加载耗时"""
+    try:
+        sample = vectorstore._collection.get(limit=1, include=["embeddings"])["embeddings"]
+        if sample is not None and len(sample):
+            vectorstore._collection.query(query_embeddings=[list(sample[0])], n_results=1, include=[])
+            logger.info(f"已预热vectorstore索引: {name}")
+    except Exception as e:
+        # 预热失败不影响使用，第一个查询会自行加载索引
+        logger.warning(f"预热vectorstore索引失败 {name}: {str(e)}")
+
+
+@functools.lru_cache(maxsize=None)
+def _persistent_client(persist_dir: str):
+    """每个持久化目录共用一个chromadb.PersistentClient，加载检查、构建和检索不再各自新建客户端"""
+    return chromadb.PersistentClient(path=persist_dir)
+
+
+def _open_vectorstore(service: Dict) -> Chroma:
+    """在repo共用的PersistentClient上打开（或创建）集合，包装为LangChain的Chroma供检索使用"""
+    return Chroma(
+        client=_persistent_client(service["persist_directory"]),
+        collection_name=service["collection_name"],
+        embedding_function=service["embedding_model"]
+    )
+
+
+# 同时保留在内存中的vectorstore数量默认上限
+DEFAULT_MAX_RESIDENT_VECTORSTORES = 16
+
+
 # 单例服务管理器，用于缓存不同repo的服务实例
 class RepoServiceManager:
     _instance = None
     _repo_services: Dict[str, Dict] = {}
+    # 保护_key_locks和_resident的全局锁
+    _lock = threading.Lock()
+    # 每个repo一把创建锁，避免并发请求重复创建同一个服务
+    _key_locks: Dict[str, threading.Lock] = {}
+    # 已加载vectorstore的repo，按最近访问顺序排列（LRU）
+    _resident: "OrderedDict[str, None]" = OrderedDict()
     
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(RepoServiceManager, cls).__new__(cls)
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(RepoServiceManager, cls).__new__(cls)
+                    cls._instance.max_resident = int(cls._instance.config_manager.get_config_value(
+                        'max_resident_vectorstores', DEFAULT_MAX_RESIDENT_VECTORSTORES))
         return cls._instance
     
+    @functools.cached_property
+    def config_manager(self) -> ConfigManager:
+        """所有repo共用的配置管理器"""
+        return get_default_config_manager()
+    
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+    
     def get_service(self, owner: str, repo: str) -> Dict:
         """获取指定owner/repo的服务实例"""
         key = f"{owner}/{repo}"
-        if key not in self._repo_services:
-            # 创建新的服务实例
-            self._repo_services[key] = self._create_service(owner, repo)
-        return self._repo_services[key]
+        service = self._repo_services.get(key)
+        if service is None:
+            with self._key_lock(key):
+                # 双重检查：等待锁期间可能已被其他线程创建
+                service = self._repo_services.get(key)
+                if service is None:
+                    # 创建新的服务实例
+                    service = self._create_service(owner, repo)
+                    self._repo_services[key] = service
+        elif service["initialized"] and service["vectorstore"] is None:
+            # vectorstore曾因LRU淘汰被释放，重新加载
+            logger.info(f"重新加载已释放的vectorstore: {key}")
+            self._reload_evicted_vectorstore(service)
+        self._touch(key, service)
+        return service
+    
+    def _reload_evicted_vectorstore(self, service: Dict):
+        """从持久化目录重新加载被释放的vectorstore，只做加载不做嵌入
+        
+        get_service会在请求处理的事件循环中被调用，这里不能进入构建流程（同步嵌入且内部使用asyncio.run）。
+        持久化数据已过期或加载失败时把服务标记为未初始化，由调用方通过aupdate_service_vectorstore在线程池中重建。
+        """
+        with service["build_lock"]:
+            if service["vectorstore"] is not None:
+                # 等待锁期间已被其他线程加载或重建
+                return
+            try:
+                persisted = self._load_persisted_vectorstore(service)
+            except Exception as e:
+                logger.error(f"重新加载vectorstore时出错 {service['owner']}/{service['repo']}: {str(e)}")
+                persisted = None
+            if persisted is None:
+                logger.info(f"持久化vectorstore已过期或不可用，等待重建: {service['owner']}/{service['repo']}")
+                service["initialized"] = False
+                return
+            service["vectorstore"], service["parent_store"] = persisted
+    
+    def _touch(self, key: str, service: Dict):
+        """记录vectorstore的访问顺序，超过上限时释放最久未使用的vectorstore"""
+        if service["vectorstore"] is None:
+            return
+        evicted = []
+        with self._lock:
+            self._resident[key] = None
+            self._resident.move_to_end(key)
+            while len(self._resident) > self.max_resident:
+                old_key, _ = self._resident.popitem(last=False)
+                evicted.append(old_key)
+        for old_key in evicted:
+            old_service = self._repo_services.get(old_key)
+            if old_service is None:
+                continue
+            with old_service["build_lock"]:
+                # 服务仍保持已注册和initialized状态，下次访问时从持久化目录重新加载
+                old_service["vectorstore"] = None
+                old_service["parent_store"] = None
+                old_service["langgraph_wrapper"] = None
+                old_service["answer_cache"].clear()
+            logger.info(f"释放最久未使用的vectorstore: {old_key}")
     
     def _create_service(self, owner: str, repo: str) -> Dict:
         """创建新的服务实例"""
         logger.info(f"创建新的服务实例: {owner}/{repo}")
         
-        # 初始化配置管理器（使用自动计算的默认路径）和获取DashScope API密钥
-        config_manager = ConfigManager()
+        # 使用共用的配置管理器获取DashScope API密钥
+        config_manager = self.config_manager
         dashscope_api_key = config_manager.get_dashscope_api_key()
         
         if not dashscope_api_key:
             raise ValueError("DashScope API key not found. Please set it in the config file or as an environment variable.")
         
-        # 创建嵌入模型
-        embd = DashScopeEmbeddings(model="text-embedding-v4", dashscope_api_key=dashscope_api_key)
+        # 嵌入模型在所有repo之间共享，不再为每个repo单独创建（按embedding_backend配置选择DashScope或本地模型）
+        embd = get_configured_embeddings(config_manager)
         
         # 使用配置管理器获取PR审查数据目录路径
         data_dir = config_manager.get_pr_review_data_dir()
@@ -57,37 +357,38 @@ class RepoServiceManager:
             "owner": owner,
             "repo": repo,
             "vectorstore": None,
+            # 子块parent_id -> 父块文本，与vectorstore一起加载和重建
+            "parent_store": None,
+            # rag_service复用的LangGraphWrapper，vectorstore释放或重建时置空
+            "langgraph_wrapper": None,
             "embedding_model": embd,
             "excel_file_path": excel_file_path,
             "persist_directory": persist_dir,
             "collection_name": collection_name,
+            # 每个owner/repo独立的答案缓存，语料变化（重建vectorstore）时清空
+            "answer_cache": SemanticCache(owner, repo),
+            # 防止同一repo并发重建vectorstore
+            "build_lock": threading.Lock(),
             "initialized": False
         }
         
-        # 尝试加载已持久化的vectorstore
-        if os.path.exists(persist_dir):
-            try:
-                logger.info(f"尝试加载已持久化的vectorstore: {owner}/{repo}")
-                vectorstore = Chroma(
-                    collection_name=collection_name,
-                    embedding_function=embd,
-                    persist_directory=persist_dir
-                )
-                # 检查vectorstore是否包含文档
-                if vectorstore._collection.count() > 0:
-                    service["vectorstore"] = vectorstore
-                    service["initialized"] = True
-                    logger.info(f"成功加载已持久化的vectorstore: {owner}/{repo}")
-                else:
-                    logger.warning(f"持久化目录存在但为空: {persist_dir}")
-            except Exception as e:
-                logger.error(f"加载已持久化的vectorstore时出错: {str(e)}")
+        # 尝试加载已持久化的vectorstore：只加载与当前Excel一致的集合，过期的集合留给构建流程重建
+        try:
+            persisted = self._load_persisted_vectorstore(service)
+            if persisted is not None:
+                service["vectorstore"], service["parent_store"] = persisted
+                service["initialized"] = True
+                logger.info(f"成功加载已持久化的vectorstore: {owner}/{repo}")
+            else:
+                logger.info(f"没有可用的持久化vectorstore（不存在或已过期），等待构建: {owner}/{repo}")
+        except Exception as e:
+            logger.error(f"加载已持久化的vectorstore时出错: {str(e)}")
         
         return service
     
-    def get_all_services(self) -> Dict[str, Dict]:
-        """获取所有已创建的服务实例"""
-        return self._repo_services.copy()
+    def get_all_services(self) -> Mapping[str, Dict]:
+        """获取所有已创建服务实例的只读视图（不复制；需要快照的调用方自行dict()/list()）"""
+        return MappingProxyType(self._repo_services)
         
     def update_service_vectorstore(self, owner: str, repo: str):
         """更新服务的vectorstore"""
@@ -95,9 +396,80 @@ class RepoServiceManager:
         if key in self._repo_services:
             service = self._repo_services[key]
             self._build_vectorstore(service)
+            self._touch(key, service)
+    
+    def build_all(self, pairs: List[Tuple[str, str]], max_workers: int = 8) -> Dict[str, bool]:
+        """并行注册多个repo，并为尚未初始化的repo构建vectorstore
+        
+        各repo的持久化目录互相独立，构建互不影响；同一repo仍由build_lock串行。
+        
+        Returns:
+            owner/repo -> 是否已初始化
+        """
+        def build_one(owner: str, repo: str) -> bool:
+            key = f"{owner}/{repo}"
+            try:
+                service = self.get_service(owner, repo)
+                if not service["initialized"]:
+                    self._build_vectorstore(service)
+                    self._touch(key, service)
+                return service["initialized"]
+            except Exception as e:
+                logger.error(f"构建vectorstore失败 {key}: {str(e)}")
+                return False
+        
+        if not pairs:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pairs)), thread_name_prefix="build-all") as pool:
+            results = pool.map(lambda pair: build_one(*pair), pairs)
+            return {f"{owner}/{repo}": ok for (owner, repo), ok in zip(pairs, results)}
+    
+    async def aupdate_service_vectorstore(self, owner: str, repo: str, executor=None):
+        """在线程池中更新服务的vectorstore，不阻塞事件循环
+
+        Args:
+            executor: 执行构建的线程池，为None时使用事件循环默认线程池
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, self.update_service_vectorstore, owner, repo)
     
     def _build_vectorstore(self, service: Dict):
-        """从Excel文件构建vectorstore"""
+        """从Excel文件构建vectorstore（同一repo串行执行）"""
+        with service["build_lock"]:
+            self._build_vectorstore_locked(service)
+    
+    def _load_persisted_vectorstore(self, service: Dict):
+        """持久化集合与当前Excel一致、集合非空且父块映射存在时，返回(vectorstore, parent_store)，否则返回None
+
+        先比较(大小:修改时间)签名，只用一次stat；签名不同（例如文件被原样重写）时再按内容摘要确认。
+        """
+        persist_dir = service["persist_directory"]
+        excel_file_path = service["excel_file_path"]
+        # 一次stat同时判断Excel是否存在并得到签名
+        try:
+            excel_stat = os.stat(excel_file_path)
+        except FileNotFoundError:
+            return None
+        if not os.path.exists(os.path.join(persist_dir, "chroma.sqlite3")):
+            return None
+        parent_store = ParentStore.load(os.path.join(persist_dir, PARENT_STORE_FILENAME))
+        if parent_store is None:
+            return None
+        vectorstore = _open_vectorstore(service)
+        metadata = vectorstore._collection.metadata or {}
+        if _collection_embedding_model(metadata) != service["embedding_model"].model:
+            return None
+        if (metadata.get(EXCEL_STAT_KEY) != _stat_signature(excel_file_path, excel_stat)
+                and metadata.get(EXCEL_DIGEST_KEY) != _excel_digest(excel_file_path)):
+            return None
+        if vectorstore._collection.count() == 0:
+            return None
+        # 在后台线程预热索引，加载流程立即返回
+        threading.Thread(target=_prewarm_vectorstore, args=(vectorstore, service["collection_name"]),
+                         name="chroma-prewarm", daemon=True).start()
+        return vectorstore, parent_store
+    
+    def _build_vectorstore_locked(self, service: Dict):
         excel_file_path = service["excel_file_path"]
         
         # 检查Excel文件是否存在
@@ -107,39 +479,103 @@ class RepoServiceManager:
             return
         
         try:
-            # 加载PR数据
-            pr_docs = load_excel_pr_data(excel_file_path)
+            # Excel内容未变化时直接复用持久化的vectorstore，避免重新嵌入
+            try:
+                persisted = self._load_persisted_vectorstore(service)
+            except Exception as e:
+                logger.warning(f"加载已持久化的vectorstore失败，将重新构建: {str(e)}")
+                persisted = None
+            if persisted is not None:
+                service["vectorstore"], service["parent_store"] = persisted
+                service["initialized"] = True
+                logger.info(f"持久化的vectorstore已是最新，跳过重建: {service['owner']}/{service['repo']}")
+                return
+            
+            # 先记录签名和摘要再读取数据，构建期间文件被改写时下次会重新构建
+            excel_stat = _stat_signature(excel_file_path)
+            excel_digest = _excel_digest(excel_file_path)
+            
+            # 加载并切分PR数据（在进程池中执行，嵌入和写入仍在当前线程）
+            split_result = _split_pr_documents_in_pool(excel_file_path)
             
-            if not pr_docs:
+            if split_result is None:
                 logger.warning("没有加载到PR数据")
                 service["initialized"] = False
                 return
-            
-            # 将数据转换为LangChain Document对象
-            documents = [Document(page_content=doc['page_content'], metadata=doc['metadata']) for doc in pr_docs]
-            
-            # 分割文档 - 增大块大小以确保评论部分不会被分割出去
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=2000, 
-                chunk_overlap=300,
-                separators=["\n\n", "\n", " ", ""]
-            )
-            doc_splits = text_splitter.split_documents(documents)
+            parent_store, ids, texts, metadatas = split_result
             
             # 创建持久化目录
-            persist_dir = os.path.join(os.path.dirname(service["excel_file_path"]), "chroma_db")
+            persist_dir = service["persist_directory"]
             os.makedirs(persist_dir, exist_ok=True)
             
-            # 创建vectorstore并设置持久化目录
-            vectorstore = Chroma.from_documents(
-                documents=doc_splits,
-                collection_name=f"rag-chroma-{service['owner']}-{service['repo']}",
-                embedding=service["embedding_model"],
-                persist_directory=persist_dir
-            )
+            # 先删除旧的父块映射：构建中途失败时不会被误认为是完整的持久化数据
+            parents_path = os.path.join(persist_dir, PARENT_STORE_FILENAME)
+            if os.path.exists(parents_path):
+                os.remove(parents_path)
+            
+            # 在已有集合上增量更新：分块ID由内容决定，只嵌入新增的分块，删除不再出现的分块
+            vectorstore = _open_vectorstore(service)
+            embedding_model = service["embedding_model"].model
+            if _collection_embedding_model(vectorstore._collection.metadata or {}) != embedding_model:
+                # 嵌入模型已切换，已有向量无法复用，删除集合后全部重新嵌入
+                logger.info(f"嵌入模型已切换为 {embedding_model}，重建整个集合")
+                vectorstore.delete_collection()
+                vectorstore = _open_vectorstore(service)
+            collection = vectorstore._collection
+            max_batch = _chroma_max_batch(vectorstore)
+            existing_ids = set(collection.get(include=[])["ids"])
+            current_ids = set(ids)
+            
+            # 删除过期分块前先取出它们的向量：只有metadata变化（例如issue链接更新）的分块文本不变，可直接复用
+            stale_ids = list(existing_ids - current_ids)
+            reusable_vectors = {}
+            for i in range(0, len(stale_ids), max_batch):
+                batch_ids = stale_ids[i:i + max_batch]
+                stale = collection.get(ids=batch_ids, include=["documents", "embeddings"])
+                for text, vector in zip(stale["documents"], stale["embeddings"]):
+                    reusable_vectors[_text_key(text)] = vector
+                collection.delete(ids=batch_ids)
+            
+            new_positions = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing_ids]
+            logger.info(f"增量更新vectorstore: 新增 {len(new_positions)} 个分块，删除 {len(stale_ids)} 个分块，"
+                        f"复用 {len(ids) - len(new_positions)} 个分块")
+            
+            if new_positions:
+                # 相同文本只嵌入一次，已有向量的文本直接复用
+                new_texts = [texts[i] for i in new_positions]
+                new_keys = [_text_key(text) for text in new_texts]
+                pending = {}
+                for key, text in zip(new_keys, new_texts):
+                    if key not in reusable_vectors:
+                        pending.setdefault(key, text)
+                logger.info(f"需要嵌入 {len(pending)} 个不同文本，复用 {len(new_texts) - len(pending)} 个分块的已有向量")
+                # 批量并发预先嵌入（_build_vectorstore在工作线程中执行，可以使用asyncio.run）
+                embedded = asyncio.run(_aembed_all_in_own_loop(service["embedding_model"], list(pending.values())))
+                reusable_vectors.update(zip(pending.keys(), embedded))
+                vectors = [_as_list(reusable_vectors[key]) for key in new_keys]
+                new_ids = [ids[i] for i in new_positions]
+                new_metadatas = [metadatas[i] for i in new_positions]
+                # 按chromadb的单批上限分批写入，超出上限会直接报错
+                for i in range(0, len(new_ids), max_batch):
+                    collection.add(
+                        ids=new_ids[i:i + max_batch],
+                        embeddings=vectors[i:i + max_batch],
+                        documents=new_texts[i:i + max_batch],
+                        metadatas=new_metadatas[i:i + max_batch]
+                    )
+            
+            # 写入完成后再更新集合元数据中的Excel签名和摘要，供下次判断是否需要重建
+            collection.modify(metadata={EXCEL_DIGEST_KEY: excel_digest, EXCEL_STAT_KEY: excel_stat,
+                                        EMBEDDING_MODEL_KEY: embedding_model})
+            
+            # 父块映射在向量写入完成后再保存，作为本次构建完整的标志
+            parent_store.save(parents_path)
             
             service["vectorstore"] = vectorstore
+            service["parent_store"] = parent_store
+            service["langgraph_wrapper"] = None
             service["initialized"] = True
+            service["answer_cache"].clear()
             logger.info(f"成功为 {service['owner']}/{service['repo']} 构建vectorstore")
         except Exception as e:
             logger.error(f"构建vectorstore时出错: {str(e)}")
@@ -0,0 +1,56 @@
+import functools
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到Python路径（pytest每个会话只加载一次conftest.py，测试模块不再各自修改sys.path）
+_TEST_DIR = Path(__file__).resolve().parent
+_PROJECT_ROOT = str(_TEST_DIR.parent)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+# 快照文件目录：__snapshots__/<测试模块名>/<用例名>.txt
+SNAPSHOT_DIR = _TEST_DIR / "__snapshots__"
+
+
+def pytest_addoption(parser):
+    parser.addoption("--snapshot-update", action="store_true", default=False,
+                     help="用当前输出重写快照文件")
+
+
+@pytest.fixture
+def cached_json_loads(monkeypatch):
+    """让format_as_mindmap对相同的JSON字符串只解析一次，由传入较长JSON载荷的用例按需使用
+
+    解析结果只被读取（extend到示例列表），共用同一个对象是安全的；解析失败不会被缓存。
+    """
+    graph_defs = sys.modules.get("libs.rag_base.graphs.graph_defs")
+    if graph_defs is None:
+        # 未导入graph_defs的测试模块不需要
+        return
+    monkeypatch.setattr(graph_defs, "_json_loads", _cached_loads(graph_defs._json_loads))
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_loads(loads):
+    return functools.lru_cache(maxsize=128)(loads)
+
+
+@pytest.fixture
+def snapshot(request):
+    """把输出文本与已记录的快照逐字节比较；快照不存在时报错，--snapshot-update时重写快照"""
+    path = SNAPSHOT_DIR / Path(request.module.__file__).stem / f"{request.node.name}.txt"
+    update = request.config.getoption("--snapshot-update")
+
+    def _assert_match(text):
+        if update:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            return
+        if not path.exists():
+            pytest.fail(f"缺少快照 {path}，请使用--snapshot-update生成")
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            assert text == f.read()
+    return _assert_match
@@ -1,8 +1,8 @@
-from util.config_manager import ConfigManager
+from util.config_manager import get_default_config_manager
 from github_file_fetcher import GitHubFileFetcher
 
 # 初始化配置管理器（使用自动计算的默认路径）并获取GitHub token
-config_manager = ConfigManager()
+config_manager = get_default_config_manager()
 github_token = config_manager.get_github_token()
 
 # 创建实例
@@ -1,6 +1,45 @@
 import os
+import copy
+import contextlib
+import functools
 import json
-from typing import Optional
+from typing import Dict, Optional, Set, Tuple
+
+# 优先使用orjson读写配置文件，未安装时退回标准库
+try:
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dumps(data: dict) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(data: dict) -> bytes:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+# 环境变量查找（os.environ是进程内唯一的映射，绑定其get方法仍能读到之后设置的变量）
+_env_get = os.environ.get
+
+# 默认配置文件路径：项目根目录（util目录的父目录）下的cfg/config.json
+_DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cfg", "config.json")
+
+# 已解析的配置文件缓存：绝对路径 -> ((mtime_ns, size), 配置数据)
+# 各ConfigManager实例拿到的是副本，set_*修改config_data不会影响缓存
+_CONFIG_CACHE: Dict[str, Tuple[Tuple[int, int], dict]] = {}
+# 本进程中已确认存在的配置目录，写入前不再重复创建
+_KNOWN_CONFIG_DIRS: Set[str] = set()
+
+
+def _stat_key(st: os.stat_result) -> Tuple[int, int]:
+    return st.st_mtime_ns, st.st_size
+
+
+@functools.lru_cache(maxsize=256)
+def _env_key(key: str) -> str:
+    """配置项键名对应的环境变量名（大写，下划线替换点）"""
+    return key.upper().replace(".", "_")
+
 
 class ConfigManager:
     """配置管理器，用于读取和管理配置文件中的key"""
@@ -13,34 +52,73 @@ class ConfigManager:
         """
         # 如果没有提供配置路径，使用相对于项目根目录的默认路径
         if config_path is None:
-            # 获取当前文件所在目录
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            # 计算项目根目录（util目录的父目录）
-            project_root = os.path.dirname(current_dir)
-            # 设置默认配置路径
-            config_path = os.path.join(project_root, "cfg", "config.json")
+            config_path = _DEFAULT_CONFIG_PATH
             
         self.config_path = config_path
-        self.config_data = self._load_config()
+        # 缓存键和写入时使用的绝对路径只计算一次
+        self._abs_path = os.path.abspath(config_path)
+        # 已读取的配置数据，及读取时配置文件的(mtime_ns, size)（文件不存在时为None）
+        self._config_data: Optional[dict] = None
+        self._loaded_stat: Optional[Tuple[int, int]] = None
+        # get_max_concurrent_pr_collection转换后的结果
+        self._max_concurrent_pr_collection: Optional[int] = None
+        # batch()嵌套层数，以及批量修改期间是否有未保存的修改
+        self._batch_depth = 0
+        self._dirty = False
+    
+    @property
+    def config_data(self) -> dict:
+        """配置数据：首次访问时读取配置文件，之后每次访问检查文件的修改时间和大小，
+        文件被修改（例如更换了github_token）后重新读取；batch()中尚未保存的修改不会被覆盖
+        """
+        try:
+            stat_key = _stat_key(os.stat(self._abs_path))
+        except FileNotFoundError:
+            stat_key = None
+        if self._config_data is None or (stat_key != self._loaded_stat and not self._dirty):
+            self._config_data = self._load_config(stat_key)
+            self._loaded_stat = stat_key
+            self._max_concurrent_pr_collection = None
+        return self._config_data
+    
+    def reload(self):
+        """丢弃本实例已读取的配置，下次访问时重新读取配置文件"""
+        self._config_data = None
+        self._max_concurrent_pr_collection = None
+    
+    @staticmethod
+    def invalidate_cache():
+        """清空已解析的配置文件缓存（测试中直接改写配置文件后使用）"""
+        _CONFIG_CACHE.clear()
     
-    def _load_config(self) -> dict:
-        """加载配置文件
+    def _load_config(self, stat_key: Optional[Tuple[int, int]]) -> dict:
+        """加载配置文件，文件未修改时复用已解析的结果
+        
+        Args:
+            stat_key: 调用方刚取得的配置文件(mtime_ns, size)，文件不存在时为None
         
         Returns:
             dict: 配置数据
         """
-        if not os.path.exists(self.config_path):
-            # 如果配置文件不存在，创建一个空的配置文件
-            default_config = {
+        abs_path = self._abs_path
+        if stat_key is None:
+            # 如果配置文件不存在，使用空的默认配置（各项可由环境变量提供），
+            # 第一次通过set_*/update实际修改配置时才创建文件
+            return {
                 "github_token": "",
                 "dashscope_api_key": "",
                 "openai_api_key": ""
             }
-            self._save_config(default_config)
-            return default_config
         
-        with open(self.config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        cached = _CONFIG_CACHE.get(abs_path)
+        if cached is not None and cached[0] == stat_key:
+            return copy.deepcopy(cached[1])
+        
+        # 整个文件一次读入（无缓冲的原始文件对象readall按文件大小读取）再解析
+        with open(abs_path, 'rb', buffering=0) as f:
+            config_data = _json_loads(f.read())
+        _CONFIG_CACHE[abs_path] = (stat_key, config_data)
+        return copy.deepcopy(config_data)
     
     def _save_config(self, config_data: dict):
         """保存配置文件
@@ -48,13 +126,40 @@ class ConfigManager:
         Args:
             config_data: 配置数据
         """
+        abs_path = self._abs_path
+        # 文件自上次读写后未被修改且内容相同时跳过写入
+        cached = _CONFIG_CACHE.get(abs_path)
+        if cached is not None and cached[1] == config_data:
+            try:
+                if _stat_key(os.stat(abs_path)) == cached[0]:
+                    return
+            except FileNotFoundError:
+                pass
+        
         # 确保配置目录存在
-        config_dir = os.path.dirname(self.config_path)
-        if config_dir and not os.path.exists(config_dir):
-            os.makedirs(config_dir)
+        config_dir = os.path.dirname(abs_path)
+        if config_dir not in _KNOWN_CONFIG_DIRS:
+            os.makedirs(config_dir, exist_ok=True)
+            _KNOWN_CONFIG_DIRS.add(config_dir)
             
-        with open(self.config_path, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=2, ensure_ascii=False)
+        with open(self.config_path, 'wb') as f:
+            f.write(_json_dumps(config_data))
+        # 刚写入的内容直接更新缓存，下次构造或访问时无需重新解析
+        stat_key = _stat_key(os.stat(abs_path))
+        _CONFIG_CACHE[abs_path] = (stat_key, copy.deepcopy(config_data))
+        if config_data is self._config_data:
+            self._loaded_stat = stat_key
+    
+    # 密钥类配置项 -> 配置文件中未设置时使用的环境变量
+    _SECRETS = {
+        "github_token": "GITHUB_TOKEN",
+        "dashscope_api_key": "DASHSCOPE_API_KEY",
+        "openai_api_key": "OPENAI_API_KEY",
+    }
+    
+    def _get_secret(self, key: str) -> Optional[str]:
+        """优先读取配置文件中的密钥，未设置时从对应的环境变量获取，都没有则返回None"""
+        return self.config_data.get(key) or _env_get(self._SECRETS[key]) or None
     
     def get_github_token(self) -> Optional[str]:
         """获取GitHub token
@@ -62,11 +167,7 @@ class ConfigManager:
         Returns:
             str: GitHub token，如果未设置则返回None
         """
-        token = self.config_data.get("github_token")
-        if not token:
-            # 如果配置文件中没有token，则尝试从环境变量获取
-            token = os.environ.get("GITHUB_TOKEN")
-        return token if token else None
+        return self._get_secret("github_token")
     
     def get_dashscope_api_key(self) -> Optional[str]:
         """获取DashScope API key
@@ -74,11 +175,7 @@ class ConfigManager:
         Returns:
             str: DashScope API key，如果未设置则返回None
         """
-        api_key = self.config_data.get("dashscope_api_key")
-        if not api_key:
-            # 如果配置文件中没有api key，则尝试从环境变量获取
-            api_key = os.environ.get("DASHSCOPE_API_KEY")
-        return api_key if api_key else None
+        return self._get_secret("dashscope_api_key")
     
     def get_openai_api_key(self) -> Optional[str]:
         """获取OpenAI API key
@@ -86,11 +183,7 @@ class ConfigManager:
         Returns:
             str: OpenAI API key，如果未设置则返回None
         """
-        api_key = self.config_data.get("openai_api_key")
-        if not api_key:
-            # 如果配置文件中没有api key，则尝试从环境变量获取
-            api_key = os.environ.get("OPENAI_API_KEY")
-        return api_key if api_key else None
+        return self._get_secret("openai_api_key")
         
     def get_pr_review_data_dir(self) -> str:
         """获取PR审查数据目录路径
@@ -101,17 +194,48 @@ class ConfigManager:
         data_dir = self.config_data.get("pr_review_data_dir")
         if not data_dir:
             # 如果配置文件中没有设置，则尝试从环境变量获取，否则返回默认值
-            data_dir = os.environ.get("PR_REVIEW_DATA_DIR", "./pr_review_data")
+            data_dir = _env_get("PR_REVIEW_DATA_DIR", "./pr_review_data")
         return data_dir
     
+    def update(self, **kwargs):
+        """一次修改多个配置项并只写一次文件，值都未变化时不写文件
+        
+        Args:
+            **kwargs: 配置项键名和新值
+        """
+        config_data = self.config_data
+        changed = False
+        for key, value in kwargs.items():
+            if key not in config_data or config_data[key] != value:
+                config_data[key] = value
+                changed = True
+        if not changed:
+            return
+        if self._batch_depth:
+            # batch()中只记录修改，退出时统一保存
+            self._dirty = True
+        else:
+            self._save_config(config_data)
+    
+    @contextlib.contextmanager
+    def batch(self):
+        """批量修改配置：with块内的set_*/update只修改内存中的配置，退出最外层with时写一次文件"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._dirty:
+                self._dirty = False
+                self._save_config(self._config_data)
+    
     def set_github_token(self, token: str):
         """设置GitHub token
         
         Args:
             token: GitHub token
         """
-        self.config_data["github_token"] = token
-        self._save_config(self.config_data)
+        self.update(github_token=token)
     
     def set_dashscope_api_key(self, api_key: str):
         """设置DashScope API key
@@ -119,8 +243,7 @@ class ConfigManager:
         Args:
             api_key: DashScope API key
         """
-        self.config_data["dashscope_api_key"] = api_key
-        self._save_config(self.config_data)
+        self.update(dashscope_api_key=api_key)
     
     def set_openai_api_key(self, api_key: str):
         """设置OpenAI API key
@@ -128,8 +251,7 @@ class ConfigManager:
         Args:
             api_key: OpenAI API key
         """
-        self.config_data["openai_api_key"] = api_key
-        self._save_config(self.config_data)
+        self.update(openai_api_key=api_key)
         
     def get_max_concurrent_pr_collection(self) -> int:
         """获取历史PR收集任务的最大并发数
@@ -137,11 +259,13 @@ class ConfigManager:
         Returns:
             int: 历史PR收集任务的最大并发数，如果未设置则返回默认值5
         """
-        max_concurrent = self.config_data.get("max_concurrent_pr_collection")
-        if max_concurrent is None:
-            # 如果配置文件中没有设置，则尝试从环境变量获取，否则返回默认值
-            max_concurrent = os.environ.get("MAX_CONCURRENT_PR_COLLECTION", 5)
-        return int(max_concurrent)
+        if self._max_concurrent_pr_collection is None:
+            max_concurrent = self.config_data.get("max_concurrent_pr_collection")
+            if max_concurrent is None:
+                # 如果配置文件中没有设置，则尝试从环境变量获取，否则返回默认值
+                max_concurrent = _env_get("MAX_CONCURRENT_PR_COLLECTION", 5)
+            self._max_concurrent_pr_collection = int(max_concurrent)
+        return self._max_concurrent_pr_collection
     
     def get_config_value(self, key: str, default_value=None):
         """获取配置文件中的任意配置值
@@ -158,12 +282,16 @@ class ConfigManager:
         
         # 如果配置文件中不存在，尝试从环境变量获取
         if value is None:
-            # 将key转换为环境变量格式（大写，下划线替换点）
-            env_key = key.upper().replace(".", "_")
-            value = os.environ.get(env_key)
+            value = _env_get(_env_key(key))
         
         # 如果仍然不存在，返回默认值
         if value is None:
             value = default_value
         
-        return value
\ No newline at end of file
+        return value
+
+
+@functools.lru_cache(maxsize=1)
+def get_default_config_manager() -> ConfigManager:
+    """进程内共用的默认配置管理器（cfg/config.json只解析一次），需要指定其他配置文件时直接构造ConfigManager"""
+    return ConfigManager()
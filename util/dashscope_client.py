@@ -0,0 +1,44 @@
+import asyncio
+import logging
+import weakref
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DASHSCOPE_BASE_URL = "https://dashscope.aliyuncs.com"
+
+# 每个事件循环共用一个HTTP/2连接池（httpx的连接不能跨事件循环复用）
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """获取当前事件循环共用的DashScope httpx.AsyncClient"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=DASHSCOPE_BASE_URL,
+            http2=True,
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=64, keepalive_expiry=120),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def prewarm():
+    """提前建立到DashScope的TCP/TLS连接，避免第一个请求承担握手耗时"""
+    try:
+        await get_async_client().get("/")
+        logger.info("已预热DashScope连接")
+    except httpx.HTTPError as e:
+        # 预热失败不影响服务启动，首个请求会重新建立连接
+        logger.warning(f"预热DashScope连接失败: {str(e)}")
+
+
+async def aclose():
+    """关闭当前事件循环的共享连接池"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()